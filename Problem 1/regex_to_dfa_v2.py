@@ -1,11 +1,30 @@
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from itertools import islice, product
+
+try:  # NumPy is only needed for the batched DFA.simulate_many path
+    import numpy as np
+except ImportError:
+    np = None
+
 # Define NFA class with epsilon transitions
 class NFA:
-    def __init__(self, states, alphabet, transitions, start, accepts):
+    __slots__ = ('states', 'alphabet', 'transitions', 'start', 'accepts', 'tags')
+
+    def __init__(self, states, alphabet, transitions, start, accepts, tags=None):
         self.states = states
         self.alphabet = alphabet
         self.transitions = transitions  # (state, symbol) -> set of states (symbol can be None for epsilon)
         self.start = start
         self.accepts = accepts
+        self.tags = tags  # Optional: accepting state -> pattern ID, for NFAs built from a set of patterns
 
     def epsilon_closure(self, states):
         """
@@ -24,183 +43,1474 @@ class NFA:
 
 # Define DFA class
 class DFA:
-    def __init__(self, states, alphabet, transitions, start, accepts):
+    __slots__ = ('states', 'alphabet', 'transitions', 'start', 'accepts', 'tags', 'ranges', 'symbol_map', 'compiled', 'reverse')
+
+    def __init__(self, states, alphabet, transitions, start, accepts, tags=None, ranges=None):
         self.states = states
         self.alphabet = alphabet
         self.transitions = transitions
         self.start = start
         self.accepts = accepts
+        self.tags = tags  # Optional: accepting state -> frozenset of matching pattern IDs
+        self.ranges = ranges  # Optional: symbol -> tuple of (low, high) codepoint ranges; None when symbols are characters
+        self.symbol_map = None  # SymbolMap over ranges, built on first use
+        self.compiled = None  # Dense DFATable, built on the first call to compile()
+        self.reverse = None  # Unanchored LazyDFA for the reversed language, built on the first call to finditer()
+
+    def symbol_of(self, character):
+        """
+            Maps an input character to the DFA symbol that covers it, or None if it is outside the alphabet.
+        """
+        if self.ranges is None:
+            return character if character in self.alphabet else None
+        if self.symbol_map is None:
+            self.symbol_map = shared_symbol_map(tuple(self.ranges))
+        return self.symbol_map.get(character)
+
+    def symbol_ranges(self):
+        """
+            Range tuple of every symbol, in sorted symbol order (a character symbol covers just itself).
+        """
+        if self.ranges is None:
+            return [label_ranges(symbol) for symbol in sorted(self.alphabet)]
+        return [self.ranges[symbol] for symbol in sorted(self.alphabet)]
 
     def simulate(self, input_string):
         """
             Determines whether an input string is accepted by the DFA, fulfilling the problem's simulation requirement.
         """
         current_state = self.start
-        for symbol in input_string:
-            if symbol not in self.alphabet:
+        for character in input_string:
+            symbol = self.symbol_of(character)
+            if symbol is None:
                 return False
             current_state = self.transitions.get((current_state, symbol), None)
             if current_state is None:
                 return False
         return current_state in self.accepts
 
-# Helper to create unique state IDs
-state_counter = 0
-def new_state():  # function to generate unique state IDs.
-    """
-        Provides fresh state IDs to avoid conflicts when building NFAs and DFAs.
-    """
-    global state_counter
-    state_counter += 1
-    return state_counter
-
-# Convert infix regex to postfix notation (handles operator precedence)
-def to_postfix(regex):
-    """
-        Prepares for parsing the regex into a form where operators are applied in the correct order.
-        Sets up precedence levels (star > concatenation > union), an operator stack, a postfix list, and an index to traverse the regex.
-    """
-    precedence = {'*': 3, '.': 2, '|': 1}  # Implicit concatenation as '.'
-    operators = []
-    postfix = []
-    i = 0
-    while i < len(regex):  # Loops through each character in the regex.
-        """
-            - Adds symbols (a, b) directly to postfix.
-            - Pushes opening parentheses onto operators.
-            - Pops operators to postfix until a matching parenthesis is found for closing parentheses.
-            - Pops operators with higher or equal precedence and pushes the current operator (* or |).
-            - Inserts implicit concatenation (.) when symbols or closing parentheses are followed by symbols or opening parentheses.
-        """
-        c = regex[i]  # Gets the current character
-        if c in 'ab':  # Symbols
-            postfix.append(c)  # If it’s a symbol, adds it directly to the postfix expression.
-        elif c == '(':
-            operators.append(c)  # Pushes the parenthesis onto the operator stack.
-        elif c == ')':
-            while operators and operators[-1] != '(':  # 
-                postfix.append(operators.pop())  # Pops operators and adds them to postfix until an opening parenthesis is found.
-            operators.pop()  # Remove '('
-        elif c in '*|':
-            while (operators and operators[-1] != '(' and precedence.get(operators[-1], 0) >= precedence[c]):
-                postfix.append(operators.pop())
-            operators.append(c)
-        # Insert implicit concatenation (.) between consecutive symbols or after ')'
-        if i + 1 < len(regex):
-            next_char = regex[i + 1]
-            if (c in 'ab)' and next_char in 'ab(') or (c in '*' and next_char in 'ab('):
-                while (operators and operators[-1] != '(' and 
-                       precedence.get(operators[-1], 0) >= precedence['.']):
-                    postfix.append(operators.pop())
-                operators.append('.')
-        i += 1
-    
-    while operators:
-        postfix.append(operators.pop())
-    return ''.join(postfix)
-
-# Build NFA from postfix regex using Thompson's construction
-def build_nfa(regex):
-    global state_counter  # Declares state_counter as global to reset it.
-    state_counter = 0
-    stack = []
-    
-    # Convert to postfix
-    postfix = to_postfix(regex)
+    def trace(self, input_string, sample_every=1, max_samples=10000):
+        """
+            Instrumented copy of simulate (simulate itself stays uninstrumented). Returns a dict with 'accepted',
+            'steps' (characters consumed), 'state_visits' (Counter of states entered, the start state included) and
+            'trace', a sample of (step, state, character) configurations taken every sample_every steps, at most
+            max_samples of them.
+        """
+        current_state = self.start
+        visits = Counter([current_state])
+        samples = []
+        steps = 0
+        accepted = None
+        for character in input_string:
+            if steps % sample_every == 0 and len(samples) < max_samples:
+                samples.append((steps, current_state, character))
+            symbol = self.symbol_of(character)
+            current_state = self.transitions.get((current_state, symbol), None) if symbol is not None else None
+            if current_state is None:
+                accepted = False
+                break
+            steps += 1
+            visits[current_state] += 1
+        if accepted is None:
+            accepted = current_state in self.accepts
+        return {'accepted': accepted, 'steps': steps, 'state_visits': visits, 'trace': samples}
+
+    def matches(self, input_string):
+        """
+            For a DFA built by regex_set_to_dfa: the set of pattern IDs that match the whole input, in one pass.
+        """
+        current_state = self.start
+        for character in input_string:
+            current_state = self.transitions.get((current_state, self.symbol_of(character)), None)
+            if current_state is None:
+                return frozenset()
+        return self.tags.get(current_state, frozenset())
+
+    def compile(self):
+        """
+            Builds (once) the dense integer transition table used by the batched simulation path.
+        """
+        if self.compiled is None:
+            self.compiled = DFATable.from_dfa(self)
+        return self.compiled
+
+    def compact(self):
+        """
+            The DFA as its dense table alone: a DFATable simulates the same language (simulate, simulate_many) from
+            flat int32 and byte arrays, without the dict of tuples, so keep it instead of the DFA when holding many
+            machines.
+        """
+        return self.compile()
+
+    def simulate_many(self, strings):
+        """
+            Simulates a batch of strings in lockstep. With NumPy every step is a single gather over the whole batch
+            and the result is a boolean array; without it the dense table is walked string by string.
+        """
+        table = self.compile()
+        if np is None:
+            return [table.run(string) for string in strings]
+        return table.run_many(strings)
+
+    @classmethod
+    def from_table(cls, table):
+        """
+            Rebuilds a DFA from a DFATable (for example one loaded from disk); the table is kept as its compiled form.
+        """
+        transitions = {}
+        for row in range(table.dead):
+            for column in range(table.other):
+                next_row = table.table[row * table.width + column]
+                if next_row != table.dead:
+                    transitions[(row, column)] = next_row
+        accepts = {row for row in range(table.dead) if table.accepting[row]}
+        dfa = cls(set(range(table.dead)), set(range(table.other)), transitions, table.start, accepts, ranges=list(table.ranges))
+        dfa.compiled = table
+        return dfa
+
+    def matcher(self):
+        """
+            Returns a resumable DFAMatcher that can be fed the input in chunks.
+        """
+        return DFAMatcher(self)
+
+    def reversed_unanchored(self):
+        """
+            Builds (once) a LazyDFA that reads text backwards and accepts at position i exactly when some match of
+            this DFA starts at i: the subset construction of the reversed DFA with a .* loop on its start. It is
+            lazy because that subset construction can be exponential in the size of this DFA (for [ab]{k}a[ab]*
+            it has 2^(k+1) states); only the subsets the text reaches are built, at most cache_size at a time.
+        """
+        if self.reverse is None:
+            labels = dict(zip(sorted(self.alphabet), self.symbol_ranges()))  # symbol -> range tuple used as edge label
+            start = max(self.states, default=-1) + 1
+            transitions = {(start, None): set(self.accepts)}
+            for label in labels.values():
+                transitions[(start, label)] = {start}  # .* loop: a match may begin anywhere
+            for (state, symbol), next_state in self.transitions.items():
+                transitions.setdefault((next_state, labels[symbol]), set()).add(state)
+            nfa = NFA(set(self.states) | {start}, set(labels.values()), transitions, start, {self.start})
+            self.reverse = LazyDFA(nfa)
+        return self.reverse
+
+    def finditer(self, text):
+        """
+            Yields the (start, end) spans of the leftmost-longest, non-overlapping matches in text. Like RE2, one
+            backward pass of the reversed unanchored DFA marks every position where a match starts; the forward
+            DFA is then only run from the reported starts, to find the longest end. A forward run goes on until the
+            DFA dies, possibly past the end of its match, but the DFA is deterministic: a run that reaches a
+            (position, state) an earlier run already passed would continue identically, so it stops there and
+            reuses that run's last accepting end. The forward runs are bounded by O(len(text) * states) in total.
+        """
+        reverse = self.reversed_unanchored()
+        # Backward pass: starts[i] is True if some match begins at position i
+        starts = bytearray(len(text) + 1)
+        entry = reverse.entry(reverse.start)
+        starts[len(text)] = entry[1]
+        for i in range(len(text) - 1, -1, -1):
+            # No match can span a foreign symbol, where the subset is empty: only the .* loop survives
+            entry = reverse.step(entry, text[i]) or reverse.entry(reverse.start)
+            starts[i] = entry[1]
+        
+        visited = {}  # (position, state) an earlier forward run passed -> its last accepting end from there, or None
+        position = starts.find(1)
+        while position != -1:
+            # Forward pass from a known start: run until the DFA dies, remembering the last accepting position
+            state = self.start
+            end = None
+            path = []
+            i = position
+            while True:
+                if (i, state) in visited:
+                    later = visited[(i, state)]
+                    end = later if later is not None else end
+                    break
+                path.append((i, state))
+                if state in self.accepts:
+                    end = i
+                if i == len(text):
+                    break
+                state = self.transitions.get((state, self.symbol_of(text[i])))
+                if state is None:
+                    break
+                i += 1
+            for key in path:
+                if key[0] >= end:  # Later runs start at or after this match's end, so earlier positions never recur
+                    visited[key] = end if key[0] == end else None
+            yield (position, end)
+            position = starts.find(1, end if end > position else end + 1)
+
+    # Language operations. The DFAs may come from different patterns: their alphabets are refined into common
+    # classes first (see product_alphabet), and the products are explored on the fly from the pair of start states
+    def intersection(self, other):
+        """
+            DFA for the strings both DFAs accept.
+        """
+        return ProductDFA((self, other), all).to_dfa()
+
+    def union(self, other):
+        """
+            DFA for the strings either DFA accepts.
+        """
+        return ProductDFA((self, other), any).to_dfa()
+
+    def difference(self, other):
+        """
+            DFA for the strings this DFA accepts and other rejects.
+        """
+        return ProductDFA((self, other), lambda accepted: accepted[0] and not accepted[1]).to_dfa()
+
+    def complement(self):
+        """
+            DFA for every string this DFA rejects, over all of Unicode (not only over the DFA's own alphabet).
+        """
+        return ProductDFA((self,), lambda accepted: not accepted[0]).to_dfa()
+
+    def shortest_witness(self):
+        """
+            A shortest string the DFA accepts, or None if its language is empty.
+        """
+        return ProductDFA((self,), any).shortest_witness()
+
+    def is_empty(self):
+        """
+            Whether the DFA accepts no string at all.
+        """
+        return self.shortest_witness() is None
+
+    def overlap(self, other):
+        """
+            A shortest string both DFAs accept, or None if the patterns never match the same string. Unlike
+            intersection(), the search stops at the first such string and never builds the product.
+        """
+        return ProductDFA((self, other), all).shortest_witness()
+
+    def subset_of(self, other):
+        """
+            Whether every string this DFA accepts is accepted by other too (other subsumes this pattern), found as
+            the lazy emptiness check of their difference.
+        """
+        return ProductDFA((self, other), lambda accepted: accepted[0] and not accepted[1]).shortest_witness() is None
+
+    def equivalent(self, other):
+        """
+            Whether both DFAs accept the same language, with Hopcroft and Karp's union-find check: the two start
+            states are merged, and every merged pair merges its successors on each class, until a pair that
+            disagrees on acceptance turns up or nothing new is merged. Near-linear in the states reached, and it stops
+            at the first disagreement.
+        """
+        dfas = (self, other)
+        classes = product_alphabet(dfas)
+        parent = {}  # Union-find forest over (0, state of self) and (1, state of other); None is the dead state
+
+        def find(node):
+            root = node
+            while parent.setdefault(root, root) != root:
+                root = parent[root]
+            while node != root:  # Path compression
+                parent[node], node = root, parent[node]
+            return root
+
+        def accepting(node):
+            side, state = node
+            return state is not None and state in dfas[side].accepts
+
+        def step(node, symbols):
+            side, state = node
+            symbol = symbols[side]
+            return side, (None if state is None or symbol is None else dfas[side].transitions.get((state, symbol)))
+
+        first, second = (0, self.start), (1, other.start)
+        parent[find(first)] = find(second)
+        pending = [(first, second)]
+        while pending:
+            first, second = pending.pop()
+            if accepting(first) != accepting(second):
+                return False
+            for _, _, symbols in classes:
+                next_first, next_second = step(first, symbols), step(second, symbols)
+                first_root, second_root = find(next_first), find(next_second)
+                if first_root != second_root:
+                    parent[first_root] = second_root
+                    pending.append((next_first, next_second))
+        return True
+
+    def minimize(self):
+        """
+            Returns the equivalent DFA with the fewest states, using Hopcroft's partition refinement (O(n log n)).
+            Missing transitions are treated as going to an implicit dead state, which is dropped again at the end.
+        """
+        dead = None  # Implicit dead state used to make the transition function total
+        symbols = sorted(self.alphabet)
+        
+        # Keep only the states reachable from the start state
+        reachable = {self.start}
+        stack = [self.start]
+        while stack:
+            state = stack.pop()
+            for symbol in symbols:
+                next_state = self.transitions.get((state, symbol))
+                if next_state is not None and next_state not in reachable:
+                    reachable.add(next_state)
+                    stack.append(next_state)
+        states = list(reachable) + [dead]
+        
+        # Inverse transitions: symbol -> target -> list of sources
+        inverse = {symbol: {} for symbol in symbols}
+        for state in states:
+            for symbol in symbols:
+                next_state = self.transitions.get((state, symbol)) if state is not None else None
+                inverse[symbol].setdefault(next_state, []).append(state)
+        
+        # Initial partition: accepting vs non-accepting states (or by set of matching pattern IDs when tagged)
+        groups = {}
+        for state in states:
+            label = self.tags.get(state, frozenset()) if self.tags is not None else state in self.accepts
+            groups.setdefault(label, set()).add(state)
+        blocks = list(groups.values())
+        block_of = {}
+        for index, block in enumerate(blocks):
+            for state in block:
+                block_of[state] = index
+        
+        # Every initial block except the largest one needs to be a splitter
+        largest = max(range(len(blocks)), key=lambda index: len(blocks[index]))
+        worklist = {(index, symbol) for index in range(len(blocks)) if index != largest for symbol in symbols}
+        
+        while worklist:
+            splitter, symbol = worklist.pop()
+            # Group the predecessors of the splitter block by the block they currently live in
+            touched = {}
+            for target in blocks[splitter]:
+                for source in inverse[symbol].get(target, ()):
+                    touched.setdefault(block_of[source], set()).add(source)
+            for index, inside in touched.items():
+                block = blocks[index]
+                if len(inside) == len(block):
+                    continue  # Block is not split by this splitter
+                # Split in O(|inside|): the old block keeps the states outside the splitter, and the smaller half
+                # becomes a new block, so only the smaller half is relabelled below
+                block.difference_update(inside)
+                if len(inside) <= len(block):
+                    new_block = inside
+                else:
+                    blocks[index], new_block = inside, block
+                new_index = len(blocks)
+                blocks.append(new_block)
+                for state in new_block:
+                    block_of[state] = new_index
+                # Whether or not (index, other) is still pending, adding the smaller half is enough
+                for other in symbols:
+                    worklist.add((new_index, other))
+        
+        # Number the blocks in BFS order from the start state, leaving out the dead block
+        dead_block = block_of[dead]
+        numbering = {block_of[self.start]: 0}
+        order = [block_of[self.start]]
+        transitions = {}
+        accepts = set()
+        tags = {} if self.tags is not None else None
+        for index in order:
+            representative = next(iter(blocks[index]))
+            if representative in self.accepts:
+                accepts.add(numbering[index])
+                if tags is not None:
+                    tags[numbering[index]] = self.tags[representative]
+            for symbol in symbols:
+                target = block_of[self.transitions.get((representative, symbol))]
+                if target == dead_block:
+                    continue
+                if target not in numbering:
+                    numbering[target] = len(numbering)
+                    order.append(target)
+                transitions[(numbering[index], symbol)] = numbering[target]
+        return DFA(set(range(len(order))), set(self.alphabet), transitions, 0, accepts, tags, self.ranges)
+
+# Dense states x symbols table compiled from a DFA
+class DFATable:
+    __slots__ = ('ranges', 'lookup', 'other', 'pad', 'width', 'dead', 'start', 'table', 'accepting', 'byte_columns')
+    MAGIC = b'DFA2'
+    HEADER = struct.Struct('=4sIIII')  # magic, number of columns, number of rows (dead row included), start row, number of ranges
+    BATCH_CELLS = 1 << 20  # Largest (strings x length) matrix run_many builds at once
+    MIN_GROUP = 8  # Fewest strings worth a vectorized group; longer strings are run one by one
+
+    def __init__(self, ranges, start, table, accepting):
+        self.lookup = shared_symbol_map(tuple(ranges))  # character -> column
+        self.ranges = self.lookup.ranges  # column -> tuple of (low, high) codepoint ranges
+        self.other = len(ranges)  # Column for characters outside the alphabet (always goes to the dead state)
+        self.pad = self.other + 1  # Column used to pad shorter strings in a batch (never changes state)
+        self.width = self.pad + 1
+        self.dead = len(accepting) - 1  # Extra last row that every missing transition falls into
+        self.start = start
+        self.table = table  # Flat int32 table: table[row * width + column] -> next row (array or memoryview)
+        self.accepting = accepting  # row -> 1 if accepting
+        self.byte_columns = self.lookup.columns  # byte -> column, where byte value b stands for the character chr(b)
+
+    def column(self, character):
+        code = ord(character)
+        if code < 256:
+            return self.byte_columns[code]
+        column = self.lookup.get(character)
+        return self.other if column is None else column
+
+    @classmethod
+    def from_dfa(cls, dfa):
+        """
+            Lays out the transitions of a DFA as a dense table, rows numbered in sorted state order and columns in
+            sorted symbol order.
+        """
+        symbols = sorted(dfa.alphabet)
+        columns = {symbol: column for column, symbol in enumerate(symbols)}
+        width = len(symbols) + 2
+        rows = {state: row for row, state in enumerate(sorted(dfa.states))}  # state -> row
+        dead = len(rows)
+        table = array('i', [dead]) * ((dead + 1) * width)
+        for row in range(dead + 1):
+            table[row * width + width - 1] = row  # Pad column
+        for (state, symbol), next_state in dfa.transitions.items():
+            table[rows[state] * width + columns[symbol]] = rows[next_state]
+        accepting = bytearray(dead + 1)
+        for state in dfa.accepts:
+            accepting[rows[state]] = 1
+        return cls(dfa.symbol_ranges(), rows[dfa.start], table, accepting)
+
+    def save(self, path):
+        """
+            Writes the table as a header, the number of ranges of every column, the (low, high) ranges themselves
+            (all uint32), the accepting flags, padding to a 4-byte boundary and then the int32 table in native byte
+            order. The file is replaced atomically.
+        """
+        counts = array('I', [len(ranges) for ranges in self.ranges])
+        bounds = array('I', [bound for ranges in self.ranges for low_high in ranges for bound in low_high])
+        header = self.HEADER.pack(self.MAGIC, len(self.ranges), self.dead + 1, self.start, len(bounds) // 2)
+        prefix = header + counts.tobytes() + bounds.tobytes() + bytes(self.accepting)
+        padding = bytes(-len(prefix) % 4)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as file:
+            file.write(prefix + padding)
+            file.write(memoryview(self.table).cast('B'))
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+            Maps a file written by save() read-only. The table and accepting flags are views into the mapping, so
+            processes that load (or fork after loading) the same file share its pages instead of copying them.
+        """
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        magic, column_count, row_count, start, range_count = cls.HEADER.unpack_from(view)
+        if magic != cls.MAGIC:
+            raise ValueError(f"{path} is not a compiled DFA file")
+        offset = cls.HEADER.size
+        counts = view[offset:offset + 4 * column_count].cast('I')
+        offset += 4 * column_count
+        bounds = view[offset:offset + 8 * range_count].cast('I')
+        offset += 8 * range_count
+        ranges = []
+        position = 0
+        for count in counts:
+            ranges.append(tuple((bounds[i], bounds[i + 1]) for i in range(position, position + 2 * count, 2)))
+            position += 2 * count
+        accepting = view[offset:offset + row_count]
+        offset += row_count + (-(offset + row_count) % 4)
+        table = view[offset:offset + row_count * (column_count + 2) * 4].cast('i')
+        return cls(ranges, start, table, accepting)
+
+    def run(self, input_string):
+        """
+            Walks the table for one string; equivalent to DFA.simulate.
+        """
+        table, width, column = self.table, self.width, self.column
+        row = self.start
+        for character in input_string:
+            row = table[row * width + column(character)]
+        return self.accepting[row] == 1
+
+    def simulate(self, input_string):
+        return self.run(input_string)
+
+    def simulate_many(self, strings):
+        """
+            Same as DFA.simulate_many, for a table kept on its own (see DFA.compact).
+        """
+        if np is None:
+            return [self.run(string) for string in strings]
+        return self.run_many(strings)
+
+    def run_bytes(self, row, data, pending=b''):
+        """
+            Continues the walk from row over UTF-8 encoded bytes (bytes, bytearray, memoryview, mmap), read in place,
+            and returns (row, pending). An ASCII byte is one table lookup; a multi-byte character is decoded to its
+            codepoint first. pending holds the start of a character cut off at the end of data and is passed back in
+            with the next chunk. Bytes that are not valid UTF-8 match no symbol and lead to the dead row. Stops early
+            once the dead row is reached.
+        """
+        table, width, byte_columns, dead = self.table, self.width, self.byte_columns, self.dead
+        if pending:
+            data = pending + bytes(data)  # Only the first chunk after a cut-off character is copied
+        iterator = iter(memoryview(data).cast('B'))
+        for byte in iterator:
+            if byte < 0x80:
+                row = table[row * width + byte_columns[byte]]
+            else:
+                sequence = bytes([byte, *islice(iterator, UTF8_LENGTHS[byte] - 1)])
+                if len(sequence) < UTF8_LENGTHS[byte]:
+                    return row, sequence
+                row = table[row * width + self.utf8_column(sequence)]
+            if row == dead:
+                break
+        return row, b''
+
+    def utf8_column(self, sequence):
+        try:
+            return self.column(sequence.decode('utf-8'))
+        except UnicodeDecodeError:  # Invalid lead byte, continuation, overlong form or surrogate
+            return self.other
+
+    def encode(self, strings):
+        """
+            Turns a batch of strings into a (batch, max_length) matrix of column indices, padded with the pad column.
+        """
+        lengths = np.fromiter((len(string) for string in strings), dtype=np.int64, count=len(strings))
+        width = int(lengths.max()) if len(strings) else 0
+        # surrogatepass keeps lone surrogates as their codepoints, as simulate() sees them
+        codes = np.frombuffer(''.join(strings).encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+        # Codepoint -> column by binary search over the sorted range bounds; uncovered codepoints are "other"
+        columns = np.full(len(codes), self.other, dtype=np.int32)
+        if self.lookup.lows:
+            lows = np.array(self.lookup.lows, dtype=np.int64)
+            highs = np.array(self.lookup.highs, dtype=np.int64)
+            owners = np.array(self.lookup.symbols, dtype=np.int32)
+            index = np.maximum(np.searchsorted(lows, codes, side='right') - 1, 0)
+            inside = (codes >= lows[index]) & (codes <= highs[index])
+            columns[inside] = owners[index[inside]]
+        matrix = np.full((len(strings), width), self.pad, dtype=np.int32)
+        matrix[np.arange(width) < lengths[:, None]] = columns  # Row-major fill matches the concatenation order
+        return matrix
+
+    def run_many(self, strings):
+        """
+            Advances every string of the batch one symbol per step with a vectorized gather. The strings are sorted
+            by length and run in groups whose lengths are within a factor of two and whose padded matrix has at most
+            BATCH_CELLS cells, so padding never more than doubles the work and one long string cannot blow up the
+            matrix; a string too long to share a group with MIN_GROUP others is walked alone with run().
+        """
+        strings = list(strings)
+        table = np.frombuffer(self.table, dtype=np.int32).reshape(self.dead + 1, self.width)
+        accepting = np.frombuffer(bytes(self.accepting), dtype=np.uint8) == 1
+        results = np.zeros(len(strings), dtype=bool)
+        order = sorted(range(len(strings)), key=lambda index: len(strings[index]))
+        position = 0
+        while position < len(order):
+            longest = max(2 * len(strings[order[position]]), 16)  # Longest string allowed in this group
+            count = self.BATCH_CELLS // longest
+            if count < self.MIN_GROUP:
+                results[order[position]] = self.run(strings[order[position]])
+                position += 1
+                continue
+            end = position
+            while end < len(order) and end - position < count and len(strings[order[end]]) <= longest:
+                end += 1
+            group = order[position:end]
+            matrix = self.encode([strings[index] for index in group])
+            rows = np.full(len(group), self.start, dtype=np.int32)
+            for step in range(matrix.shape[1]):
+                rows = table[rows, matrix[:, step]]
+            results[group] = accepting[rows]
+            position = end
+        return results
+
+# Length of the UTF-8 sequence that starts with each byte (1 for bytes that cannot start one, which then fail to decode)
+UTF8_LENGTHS = bytes(2 if 0xC2 <= byte <= 0xDF else 3 if 0xE0 <= byte <= 0xEF else 4 if 0xF0 <= byte <= 0xF4 else 1
+                     for byte in range(256))
+
+# Resumable DFA simulation over an input that arrives in chunks
+class DFAMatcher:
+    def __init__(self, dfa):
+        self.table = dfa.compile()
+        self.row = self.table.start  # Current state, kept between calls to feed()
+        self.pending = b''  # Start of a UTF-8 character cut off at the end of the last bytes chunk
+
+    def reset(self):
+        self.row = self.table.start
+        self.pending = b''
+
+    def feed(self, chunk):
+        """
+            Advances the matcher over the next chunk. A str is read symbol by symbol; bytes, bytearray, memoryview
+            and mmap objects are read in place as UTF-8 (a character may be split between chunks).
+        """
+        table = self.table
+        if isinstance(chunk, str):
+            data, width, column, dead = table.table, table.width, table.column, table.dead
+            row = self.row
+            for character in chunk:
+                row = data[row * width + column(character)]
+                if row == dead:
+                    break
+            self.row = row
+        elif self.row != table.dead:
+            self.row, self.pending = table.run_bytes(self.row, chunk, self.pending)
+        return self
+
+    def feed_file(self, file, chunk_size=1 << 16):
+        """
+            Feeds a binary file-like object through one reusable buffer, so memory stays constant for any file size.
+        """
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        while self.row != self.table.dead:
+            size = file.readinto(buffer)
+            if not size:
+                break
+            self.feed(view[:size])
+        return self
+
+    def result(self):
+        """
+            Whether the input fed so far is accepted.
+        """
+        return self.table.accepting[self.row] == 1 and not self.pending  # A cut-off character is invalid UTF-8
+
+# Character sets are tuples of sorted, disjoint (low, high) codepoint ranges
+MAX_CODEPOINT = 0x10FFFF
+
+def normalize_ranges(ranges):
+    """
+        Sorts ranges and merges the ones that overlap or touch.
+    """
+    merged = []
+    for low, high in sorted(ranges):
+        if merged and low <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+    return tuple(merged)
+
+def negate_ranges(ranges):
+    """
+        Complement of a normalized range tuple within [0, MAX_CODEPOINT].
+    """
+    negated = []
+    low = 0
+    for range_low, range_high in ranges:
+        if range_low > low:
+            negated.append((low, range_low - 1))
+        low = range_high + 1
+    if low <= MAX_CODEPOINT:
+        negated.append((low, MAX_CODEPOINT))
+    return tuple(negated)
+
+def label_ranges(label):
+    """
+        NFA edge labels are range tuples; a plain character (as in hand-built NFAs) stands for itself.
+    """
+    if isinstance(label, str):
+        return ((ord(label), ord(label)),)
+    return label
+
+DIGIT = ((ord('0'), ord('9')),)
+WORD = normalize_ranges([(ord('0'), ord('9')), (ord('A'), ord('Z')), (ord('_'), ord('_')), (ord('a'), ord('z'))])
+SPACE = normalize_ranges([(ord(c), ord(c)) for c in ' \t\n\r\f\v'])
+ANY = negate_ranges(((ord('\n'), ord('\n')),))  # '.' matches everything except a newline
+ESCAPE_CLASSES = {'d': DIGIT, 'D': negate_ranges(DIGIT), 'w': WORD, 'W': negate_ranges(WORD), 's': SPACE, 'S': negate_ranges(SPACE)}
+ESCAPE_CHARACTERS = {'n': '\n', 't': '\t', 'r': '\r', 'f': '\f', 'v': '\v', '0': '\0'}
+HEX_ESCAPES = {'x': 2, 'u': 4, 'U': 8}  # Escape letter -> number of hex digits
+MAX_REPEAT = 10000  # Largest count allowed in {m,n}
+MAX_NESTING = 100  # Deepest group nesting the recursive descent parser accepts
+MAX_NFA_STATES = 1 << 21  # Thompson's construction gives up past this many states
+
+# Recursive-descent regex parser producing the AST that Thompson's construction consumes
+class RegexParser:
+    """
+        Grammar (lowest precedence first):
+            union   := concat ('|' concat)*
+            concat  := repeat*
+            repeat  := atom ('*' | '+' | '?' | '{m}' | '{m,}' | '{,n}' | '{m,n}')*
+            atom    := literal | '.' | '[' class ']' | escape | '(' union ')'
+        AST nodes are tuples: ('set', ranges), ('empty',), ('concat', nodes), ('union', nodes), ('star', node),
+        ('plus', node), ('optional', node) and ('repeat', node, low, high) where high is None when unbounded.
+        Groups may nest at most MAX_NESTING deep and repeat counts may not exceed MAX_REPEAT.
+    """
+    def __init__(self, regex):
+        self.regex = regex
+        self.position = 0
+        self.depth = 0  # Number of open groups
+
+    def error(self, message):
+        raise ValueError(f"{message} at position {self.position} in regex {self.regex!r}")
+
+    def peek(self):
+        return self.regex[self.position] if self.position < len(self.regex) else None
+
+    def parse(self):
+        node = self.parse_union()
+        if self.position < len(self.regex):  # Only an unmatched ')' stops parse_union early
+            self.error("unbalanced ')'")
+        return node
+
+    def parse_union(self):
+        branches = [self.parse_concat()]
+        while self.peek() == '|':
+            self.position += 1
+            branches.append(self.parse_concat())
+        return branches[0] if len(branches) == 1 else ('union', branches)
+
+    def parse_concat(self):
+        pieces = []
+        while self.peek() is not None and self.peek() not in '|)':
+            pieces.append(self.parse_repeat())
+        if not pieces:
+            return ('empty',)
+        return pieces[0] if len(pieces) == 1 else ('concat', pieces)
+
+    def parse_repeat(self):
+        node = self.parse_atom()
+        while True:
+            c = self.peek()
+            if c == '*':
+                node = ('star', node)
+            elif c == '+':
+                node = ('plus', node)
+            elif c == '?':
+                node = ('optional', node)
+            elif c == '{' and self.parse_bounds() is not None:
+                low, high, end = self.parse_bounds()
+                node = ('repeat', node, low, high)
+                self.position = end
+                continue
+            else:
+                return node
+            self.position += 1
+
+    def parse_bounds(self):
+        """
+            Reads a {m}, {m,}, {,n} or {m,n} quantifier at the current position. Returns (low, high, end position),
+            or None if the brace does not start a valid quantifier (it is then an ordinary character).
+        """
+        end = self.regex.find('}', self.position)
+        if end == -1:
+            return None
+        low, comma, high = self.regex[self.position + 1:end].partition(',')
+        if not (low.isdigit() or (comma and low == '')) or not (high.isdigit() or high == ''):
+            return None
+        if not comma:
+            high = low
+        low = int(low) if low else 0
+        high = int(high) if high else None
+        if max(low, high or 0) > MAX_REPEAT:
+            self.error(f"repeat count greater than {MAX_REPEAT}")
+        if high is not None and high < low:
+            self.error("min repeat greater than max repeat")
+        return low, high, end + 1
+
+    def parse_atom(self):
+        c = self.regex[self.position]
+        if c == '(':
+            if self.depth == MAX_NESTING:
+                self.error(f"more than {MAX_NESTING} nested groups")
+            self.position += 1
+            self.depth += 1
+            node = self.parse_union()
+            if self.peek() != ')':
+                self.error("missing ')'")
+            self.position += 1
+            self.depth -= 1
+            return node
+        if c in '*+?' or (c == '{' and self.parse_bounds() is not None):
+            self.error("nothing to repeat")
+        if c in '^$':
+            self.error(f"anchor {c!r} is not supported (patterns always match the whole string)")
+        if c == '[':
+            return ('set', self.parse_class())
+        if c == '\\':
+            return ('set', self.parse_escape()[0])
+        self.position += 1
+        if c == '.':
+            return ('set', ANY)
+        return ('set', ((ord(c), ord(c)),))
+
+    def parse_escape(self):
+        """
+            Reads an escape starting at the backslash. Returns (ranges, codepoint), codepoint being None for
+            class escapes such as \\d that stand for more than one character.
+        """
+        self.position += 1
+        c = self.peek()
+        if c is None:
+            self.error("trailing backslash")
+        self.position += 1
+        if c in ESCAPE_CLASSES:
+            return ESCAPE_CLASSES[c], None
+        if c in ESCAPE_CHARACTERS:
+            code = ord(ESCAPE_CHARACTERS[c])
+        elif c in HEX_ESCAPES:
+            digits = self.regex[self.position:self.position + HEX_ESCAPES[c]]
+            if len(digits) != HEX_ESCAPES[c] or any(d not in '0123456789abcdefABCDEF' for d in digits):
+                self.error(f"bad \\{c} escape")
+            code = int(digits, 16)
+            if code > MAX_CODEPOINT:
+                self.error(f"bad \\{c} escape")
+            self.position += HEX_ESCAPES[c]
+        elif c.isascii() and c.isalnum():
+            self.error(f"bad escape \\{c}")
+        else:
+            code = ord(c)  # Escaped metacharacter or any other punctuation stands for itself
+        return ((code, code),), code
+
+    def parse_class_item(self):
+        """
+            One item inside [...]: an escape or a plain character. Returns (ranges, codepoint) like parse_escape.
+        """
+        if self.peek() == '\\':
+            return self.parse_escape()
+        code = ord(self.regex[self.position])
+        self.position += 1
+        return ((code, code),), code
+
+    def parse_class(self):
+        """
+            Reads a [...] class into normalized ranges. Supports negation with a leading '^', ranges such as a-z,
+            escapes, and ']' or '-' as literals where they cannot close the class or form a range.
+        """
+        self.position += 1
+        negate = self.peek() == '^'
+        if negate:
+            self.position += 1
+        ranges = []
+        first = True
+        while True:
+            c = self.peek()
+            if c is None:
+                self.error("unterminated character class")
+            if c == ']' and not first:
+                self.position += 1
+                break
+            first = False
+            item, low = self.parse_class_item()
+            following = self.regex[self.position + 1:self.position + 2]
+            if self.peek() == '-' and following not in ('', ']') and low is not None:
+                self.position += 1
+                _, high = self.parse_class_item()
+                if high is None or high < low:
+                    self.error("bad character range")
+                ranges.append((low, high))
+            else:
+                ranges.extend(item)
+        ranges = normalize_ranges(ranges)
+        return negate_ranges(ranges) if negate else ranges
+
+def parse(regex):
+    return RegexParser(regex).parse()
+
+# Arena that Thompson's construction writes into (one growing adjacency list per state)
+class NFABuilder:
+    def __init__(self, max_states=MAX_NFA_STATES):
+        self.max_states = max_states  # build() raises ValueError past this many states
+        self.symbol_edges = []  # state -> list of (ranges, next_state)
+        self.epsilon_edges = []  # state -> list of next_state reached on epsilon
+        self.alphabet = set()  # Edge labels (range tuples) in use
+
+    def new_state(self):
+        """
+            Appends a fresh state to the arena and returns its index.
+        """
+        self.symbol_edges.append([])
+        self.epsilon_edges.append([])
+        return len(self.epsilon_edges) - 1
+
+    def build(self, node):
+        """
+            Runs Thompson's construction over an AST from parse(). Every fragment is only a (start, accept) pair of
+            arena indices, so each operator adds a constant number of edges instead of copying its operands.
+            A character class is a single edge labelled with its ranges, never one edge per character.
+            The AST is walked with an explicit stack, so deeply nested operators such as a**...* cannot overflow
+            Python's recursion limit; a pattern needing more than max_states states raises ValueError.
+        """
+        fragments = []  # (start, accept) of every finished node, children in order before their parent
+        stack = [(node, False)]  # (node, children already built)
+        while stack:
+            node, ready = stack.pop()
+            if len(self.epsilon_edges) > self.max_states:
+                raise ValueError(f"pattern is too large (more than {self.max_states} NFA states)")
+            kind = node[0]
+            if kind == 'set':
+                "Set of characters: Creates a 2-state fragment (start → accept on any character in the ranges)."
+                start = self.new_state()
+                accept = self.new_state()
+                self.symbol_edges[start].append((node[1], accept))
+                self.alphabet.add(node[1])
+                fragments.append((start, accept))
+                continue
+            if kind == 'empty':
+                "Empty string: start → accept on epsilon."
+                start = self.new_state()
+                accept = self.new_state()
+                self.epsilon_edges[start].append(accept)
+                fragments.append((start, accept))
+                continue
+            if kind == 'repeat':
+                "Bounded repeat {m,n}: m copies of the fragment, then n - m optional copies (or a star when unbounded)."
+                _, child, low, high = node
+                pieces = [child] * low + ([('star', child)] if high is None else [('optional', child)] * (high - low))
+                stack.append((('concat', pieces) if pieces else ('empty',), False))
+                continue
+            children = node[1] if kind in ('concat', 'union') else (node[1],)
+            if not ready:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children))
+                continue
+            parts = fragments[-len(children):]
+            del fragments[-len(children):]
+            if kind == 'concat':
+                "Concatenation: Connects each fragment's accept state to the next one's start with an epsilon transition."
+                for (_, accept1), (start2, _) in zip(parts, parts[1:]):
+                    self.epsilon_edges[accept1].append(start2)
+                fragments.append((parts[0][0], parts[-1][1]))
+                continue
+            start = self.new_state()
+            accept = self.new_state()
+            if kind == 'union':
+                "Union: Creates a new start and accept state with epsilon transitions to/from every branch."
+                for branch_start, branch_accept in parts:
+                    self.epsilon_edges[start].append(branch_start)
+                    self.epsilon_edges[branch_accept].append(accept)
+                fragments.append((start, accept))
+                continue
+            (inner_start, inner_accept), = parts
+            if kind == 'star':
+                "Kleene Star (*): Adds new start and accept states with epsilon loops around the fragment."
+                self.epsilon_edges[start].extend((inner_start, accept))  # Skip or enter
+                self.epsilon_edges[inner_accept].extend((inner_start, accept))  # Loop back or exit
+            elif kind == 'plus':
+                "Plus (+): Like the star, but without the edge that skips the fragment."
+                self.epsilon_edges[start].append(inner_start)
+                self.epsilon_edges[inner_accept].extend((inner_start, accept))
+            elif kind == 'optional':
+                "Optional (?): The fragment may be entered or skipped, but not repeated."
+                self.epsilon_edges[start].extend((inner_start, accept))
+                self.epsilon_edges[inner_accept].append(accept)
+            fragments.append((start, accept))
+        return fragments.pop()
+
+    def to_nfa(self, start, accepts, tags=None):
+        """
+            Flattens the arena into the (state, symbol) -> set of states dictionary used by NFA, in one pass.
+        """
+        transitions = {}
+        for state, edges in enumerate(self.symbol_edges):
+            for symbol, next_state in edges:
+                transitions.setdefault((state, symbol), set()).add(next_state)
+        for state, next_states in enumerate(self.epsilon_edges):
+            if next_states:
+                transitions[(state, None)] = set(next_states)
+        return NFA(set(range(len(self.epsilon_edges))), set(self.alphabet), transitions, start, set(accepts), tags)
+
+# Build NFA from a regex using Thompson's construction
+def build_nfa(regex, max_states=MAX_NFA_STATES):
+    builder = NFABuilder(max_states)
+    start, accept = builder.build(parse(regex))
+    return builder.to_nfa(start, {accept})
+
+# Build one NFA for a list of regexes: every pattern's Thompson NFA hangs off a common start state
+def build_nfa_set(patterns):
+    builder = NFABuilder()
+    start = builder.new_state()
+    tags = {}  # accepting state -> pattern ID (index in patterns)
+    for pattern_id, regex in enumerate(patterns):
+        pattern_start, accept = builder.build(parse(regex))
+        builder.epsilon_edges[start].append(pattern_start)
+        tags[accept] = pattern_id
+    return builder.to_nfa(start, set(tags), tags)
+
+# Partition the codepoints used by a set of edge labels into equivalence classes (the DFA's symbols)
+def alphabet_classes(labels):
+    """
+        Two codepoints are equivalent when every label contains both or neither, so the DFA only needs one column
+        for each class. Returns (ranges, covered): ranges[symbol] is the normalized range tuple of each class and
+        covered[label] lists the classes that lie inside that label. Codepoints no label mentions get no class.
+    """
+    labels = [label_ranges(label) for label in labels]
+    points = set()
+    for label in labels:
+        for low, high in label:
+            points.update((low, high + 1))
+    points = sorted(points)
     
-    for c in postfix:
-        if c in 'ab':  # Symbol
-            "Symbol (a, b): Creates a 2-state NFA (start → accept on symbol) and pushes it."
-            start = new_state()
-            accept = new_state()
-            transitions = {(start, c): {accept}}
-            alphabet = {c}
-            stack.append(NFA({start, accept}, alphabet, transitions, start, {accept}))
-        elif c == '.':  # Concatenation
-            "Concatenation (.): Pops two NFAs, connects the first's accept state to the second's start with an epsilon transition, and pushes the combined NFA."
-            nfa2 = stack.pop()
-            nfa1 = stack.pop()
-            # Connect nfa1's accept state to nfa2's start state with epsilon transition
-            transitions = nfa1.transitions.copy()
-            transitions.update(nfa2.transitions)
-            transitions[(nfa1.accepts.pop(), None)] = {nfa2.start}  # Connects the accepting state of the first NFA to the start state of the second NFA with an epsilon transition.
-            states = nfa1.states | nfa2.states
-            alphabet = nfa1.alphabet | nfa2.alphabet
-            stack.append(NFA(states, alphabet, transitions, nfa1.start, nfa2.accepts))
-        elif c == '|':  # Union
-            "Union (|): Pops two NFAs, creates a new start and accept state with epsilon transitions to/from both NFAs, and pushes the result."
-            nfa2 = stack.pop()
-            nfa1 = stack.pop()
-            start = new_state()
-            accept = new_state()
-            transitions = nfa1.transitions.copy()
-            transitions.update(nfa2.transitions)
-            transitions[(start, None)] = {nfa1.start, nfa2.start}  # Adds epsilon transitions from the new start state to the start states of both NFAs.
-            transitions[(list(nfa1.accepts)[0], None)] = {accept}  # Adds an epsilon transition from the first NFA’s accepting state to the new accepting state.
-            transitions[(list(nfa2.accepts)[0], None)] = {accept}
-            states = nfa1.states | nfa2.states | {start, accept}
-            alphabet = nfa1.alphabet | nfa2.alphabet
-            stack.append(NFA(states, alphabet, transitions, start, {accept}))
-        elif c == '*':  # Kleene star
-            "Kleene Star (*): Pops an NFA, adds new start and accept states with epsilon loops, and pushes the result."
-            nfa = stack.pop()
-            start = new_state()
-            accept = new_state()
-            transitions = nfa.transitions.copy()
-            transitions[(start, None)] = {nfa.start, accept}  # Skip or enter, Adds epsilon transitions from the new start state to the original start state and the new accepting state (allows skipping the NFA).
-            transitions[(list(nfa.accepts)[0], None)] = {nfa.start, accept}  # Loop back or exit (allows repetition)
-            states = nfa.states | {start, accept}
-            alphabet = nfa.alphabet
-            stack.append(NFA(states, alphabet, transitions, start, {accept}))
+    # Interval i is [points[i], points[i + 1] - 1]; its signature is the list of labels that contain it
+    signatures = [[] for _ in points]
+    for number, label in enumerate(labels):
+        for low, high in label:
+            for i in range(bisect_left(points, low), bisect_left(points, high + 1)):
+                signatures[i].append(number)
     
-    return stack[0]
+    # Intervals with the same (non-empty) signature form one class
+    classes = {}  # signature -> class
+    ranges = []
+    covered = [[] for _ in labels]
+    for i, signature in enumerate(signatures):
+        if not signature:
+            continue
+        signature = tuple(signature)
+        if signature not in classes:
+            classes[signature] = len(ranges)
+            ranges.append([])
+            for number in signature:
+                covered[number].append(classes[signature])
+        ranges[classes[signature]].append((points[i], points[i + 1] - 1))
+    return [normalize_ranges(interval) for interval in ranges], dict(zip(labels, covered))
+
+# Character -> symbol lookup over a list of range tuples (one per symbol)
+class SymbolMap:
+    __slots__ = ('ranges', 'other', 'lows', 'highs', 'symbols', 'columns', 'bytes', 'cache')
+
+    def __init__(self, ranges):
+        self.ranges = ranges
+        self.other = len(ranges)  # Stands for "no symbol" in columns (it is the "other" column of a DFATable)
+        intervals = sorted((low, high, symbol) for symbol, label in enumerate(ranges) for low, high in label)
+        self.lows = array('i', [low for low, _, _ in intervals])
+        self.highs = array('i', [high for _, high, _ in intervals])
+        self.symbols = array('i', [symbol for _, _, symbol in intervals])
+        # 256-entry byte -> symbol (or other) table
+        self.columns = array('i', [self.other if symbol is None else symbol for symbol in map(self.lookup, range(256))])
+        self.bytes = None  # The same with None for other, as a list for get(); built on its first call (DFATable never needs it)
+        self.cache = {}  # character -> symbol (or None) for characters past the byte range, filled on first lookup
+
+    def lookup(self, code):
+        """
+            Symbol whose ranges contain the codepoint, or None.
+        """
+        index = bisect_right(self.lows, code) - 1
+        if index >= 0 and code <= self.highs[index]:
+            return self.symbols[index]
+        return None
+
+    def get(self, character):
+        code = ord(character)
+        if code < 256:
+            try:
+                return self.bytes[code]
+            except TypeError:  # Not built yet
+                self.bytes = [None if symbol == self.other else symbol for symbol in self.columns]
+                return self.bytes[code]
+        try:
+            return self.cache[character]
+        except KeyError:
+            symbol = self.lookup(code)
+            if len(self.cache) < 65536:  # Bounded, so arbitrary Unicode input cannot grow it without limit
+                self.cache[character] = symbol
+            return symbol
+
+@lru_cache(maxsize=4096)
+def shared_symbol_map(ranges):
+    """
+        The SymbolMap of an alphabet (a tuple of range tuples), shared by every DFA and DFATable over that alphabet.
+    """
+    return SymbolMap(ranges)
 
 # Convert NFA to DFA using subset construction
-def nfa_to_dfa(nfa):
-    dfa_states = {}
-    state_id = 0
+def nfa_to_dfa(nfa, max_states=None):
+    """
+        Subset construction where every set of NFA states is a Python int used as a bitmask (bit i = i-th NFA state),
+        so hashing and union are single big-int operations. Epsilon closures are computed once per NFA state.
+        With max_states, raises ValueError as soon as the DFA would need more states (the construction can be
+        exponential; LazyDFA runs such an NFA in bounded memory instead).
+    """
+    order = sorted(nfa.states)  # bit -> NFA state
+    index = {state: bit for bit, state in enumerate(order)}  # NFA state -> bit
+    closures = {}  # NFA state -> bitmask of its epsilon closure, filled on first use
+    
+    def closure_mask(state):
+        if state not in closures:
+            mask = 0
+            for reached in nfa.epsilon_closure({state}):
+                mask |= 1 << index[reached]
+            closures[state] = mask
+        return closures[state]
+    
+    # DFA symbols: equivalence classes of codepoints that every edge label treats the same way
+    ranges, covered = alphabet_classes({label for (_, label) in nfa.transitions if label is not None})
+    symbols = range(len(ranges))
+    
+    # For every symbol: bit of a source state -> closure of everything it reaches on that symbol
+    moves = [{} for _ in symbols]
+    sources = [0] * len(ranges)  # Bitmask of the states that have an edge on the symbol
+    for (state, label), next_states in nfa.transitions.items():
+        if label is None:
+            continue
+        mask = 0
+        for next_state in next_states:
+            mask |= closure_mask(next_state)
+        bit = index[state]
+        for symbol in covered[label_ranges(label)]:
+            moves[symbol][bit] = moves[symbol].get(bit, 0) | mask
+            sources[symbol] |= 1 << bit
+    accept_mask = 0
+    for state in nfa.accepts:
+        accept_mask |= 1 << index[state]
+    
+    dfa_states = {}  # bitmask -> DFA state
     dfa_transitions = {}
     dfa_accepts = set()
-    dfa_alphabet = nfa.alphabet
-    # A frozenset is immutable, meaning once it’s created, it cannot be modified it
-    start_set = frozenset(nfa.epsilon_closure({nfa.start}))  # it finds all states reachable from nfa.start via epsilon transitions
-    dfa_states[start_set] = state_id
-    state_id += 1
+    dfa_tags = {} if nfa.tags is not None else None  # accepting DFA state -> frozenset of pattern IDs
+    start_mask = closure_mask(nfa.start)  # All states reachable from nfa.start via epsilon transitions
+    dfa_states[start_mask] = 0
     
-    queue = [start_set]
+    queue = deque([start_mask])
     while queue:  # Loops until the queue is empty.
-        current_set = queue.pop(0)
-        current_dfa_state = dfa_states[current_set]
+        current_mask = queue.popleft()
+        current_dfa_state = dfa_states[current_mask]
         
-        if any(state in nfa.accepts for state in current_set): 
+        if current_mask & accept_mask:
             """For each set, checks if it contains an NFA accepting state to mark it as a DFA accepting state."""
             dfa_accepts.add(current_dfa_state)
+            if dfa_tags is not None:
+                accepting = current_mask & accept_mask
+                dfa_tags[current_dfa_state] = frozenset(nfa.tags[order[bit]] for bit in range(accepting.bit_length()) if accepting >> bit & 1)
         
-        for symbol in dfa_alphabet: 
-            """For each symbol, computes the set of NFA states reachable (including epsilon closures) and creates a new DFA state if unseen."""
-            next_states = set()
-            for state in current_set:
-                next_states.update(nfa.transitions.get((state, symbol), set()))
-            next_set = frozenset(nfa.epsilon_closure(next_states))
+        for symbol in symbols:
+            """For each symbol, ORs the precomputed closures of the member states that have an edge on it."""
+            symbol_moves = moves[symbol]
+            pending = current_mask & sources[symbol]
+            next_mask = 0
+            while pending:
+                lowest = pending & -pending
+                next_mask |= symbol_moves[lowest.bit_length() - 1]
+                pending ^= lowest
             
-            if not next_set:
+            if not next_mask:
                 continue
-                
-            if next_set not in dfa_states:
-                dfa_states[next_set] = state_id
-                state_id += 1
-                queue.append(next_set)
             
-            dfa_transitions[(current_dfa_state, symbol)] = dfa_states[next_set]
+            next_dfa_state = dfa_states.get(next_mask)
+            if next_dfa_state is None:
+                if max_states is not None and len(dfa_states) >= max_states:
+                    raise ValueError(f"the DFA needs more than {max_states} states")
+                next_dfa_state = dfa_states[next_mask] = len(dfa_states)
+                queue.append(next_mask)
+            
+            dfa_transitions[(current_dfa_state, symbol)] = next_dfa_state
     
-    return DFA(set(dfa_states.values()), dfa_alphabet, dfa_transitions, dfa_states[start_set], dfa_accepts)  # Creates a DFA with the computed states, alphabet, transitions, start state, and accepting states.
+    return DFA(set(dfa_states.values()), set(symbols), dfa_transitions, 0, dfa_accepts, dfa_tags, ranges)  # Creates a DFA with the computed states, alphabet, transitions, start state, and accepting states.
+
+# DFA built lazily from an NFA: subsets are only constructed when simulation reaches them
+class LazyDFA:
+    DEAD = -1  # Transition target for an empty subset: the input is rejected
+
+    def __init__(self, nfa, cache_size=1024, chars_per_eviction=10):
+        self.nfa = nfa
+        self.cache_size = cache_size  # Maximum number of DFA states (NFA subsets) kept at once
+        self.chars_per_eviction = chars_per_eviction  # Below this many characters per eviction the cache is thrashing
+        # DFA state id -> (frozenset of NFA states, accepting, {symbol: next state id}), in LRU order. Ids are never
+        # reused, so an edge to an evicted state is simply not found and the subset is rebuilt; since edges hold ids
+        # and not subsets, evicted subsets are freed and memory stays bounded by cache_size entries
+        self.cache = OrderedDict()
+        self.ids = {}  # frozenset of NFA states -> id, for the states in the cache
+        self.next_id = 0
+        self.start = frozenset(nfa.epsilon_closure({nfa.start}))
+        self.evictions = 0
+        # Symbols are the alphabet classes of the edge labels, as in nfa_to_dfa, so every cached state has at most
+        # one edge per class however many distinct characters the input has
+        ranges, covered = alphabet_classes({label for (_, label) in nfa.transitions if label is not None})
+        self.symbol_map = shared_symbol_map(tuple(ranges))
+        self.edges = {}  # NFA state -> {symbol: set of next states}
+        for (state, label), next_states in nfa.transitions.items():
+            if label is not None:
+                for symbol in covered[label_ranges(label)]:
+                    self.edges.setdefault(state, {}).setdefault(symbol, set()).update(next_states)
+
+    def move(self, current_set, symbol):
+        """
+            One subset-construction step: the epsilon closure of every NFA state reachable from current_set on symbol.
+        """
+        next_states = set()
+        for state in current_set:
+            next_states.update(self.edges.get(state, {}).get(symbol, ()))
+        return frozenset(self.nfa.epsilon_closure(next_states))
+
+    def state(self, current_set):
+        """
+            Returns the id of the cached DFA state for current_set, adding it and evicting the least recently used
+            state if the cache is full.
+        """
+        state = self.ids.get(current_set)
+        if state is not None:
+            self.cache.move_to_end(state)
+            return state
+        if len(self.cache) >= self.cache_size:
+            _, (evicted, _, _) = self.cache.popitem(last=False)
+            del self.ids[evicted]
+            self.evictions += 1
+        state = self.next_id
+        self.next_id += 1
+        self.ids[current_set] = state
+        self.cache[state] = (current_set, any(nfa_state in self.nfa.accepts for nfa_state in current_set), {})
+        return state
+
+    def entry(self, current_set):
+        """
+            The cache entry (subset, accepting, transitions) of a DFA state.
+        """
+        return self.cache[self.state(current_set)]
+
+    def step(self, entry, character):
+        """
+            The entry reached from entry on character, or None once nothing can be accepted, for callers that drive
+            the DFA one character at a time. An entry that has been evicted in the meantime still works.
+        """
+        symbol = self.symbol_map.get(character)
+        if symbol is None:
+            return None
+        transitions = entry[2]
+        next_state = transitions.get(symbol)
+        if next_state == self.DEAD:
+            return None
+        next_entry = self.cache.get(next_state)
+        if next_entry is not None:
+            self.cache.move_to_end(next_state)
+            return next_entry
+        next_set = self.move(entry[0], symbol)
+        if not next_set:
+            transitions[symbol] = self.DEAD
+            return None
+        next_state = transitions[symbol] = self.state(next_set)
+        return self.cache[next_state]
+
+    def simulate(self, input_string):
+        """
+            Runs at DFA speed over cached transitions and computes missing ones on first use. If the cache keeps
+            evicting states, the rest of the input is simulated directly on NFA state sets without caching.
+        """
+        current_set = self.start
+        state = self.state(current_set)
+        evictions = self.evictions
+        for position, character in enumerate(input_string):
+            symbol = self.symbol_map.get(character)
+            if symbol is None:
+                return False
+            entry = self.cache.get(state)
+            if entry is None:  # Evicted since the last step: look it up again by its subset
+                state = self.state(current_set)
+                entry = self.cache[state]
+            else:
+                self.cache.move_to_end(state)
+            transitions = entry[2]
+            next_state = transitions.get(symbol)
+            if next_state == self.DEAD:
+                return False
+            next_entry = self.cache.get(next_state) if next_state is not None else None
+            if next_entry is None:
+                current_set = self.move(current_set, symbol)
+                if not current_set:
+                    transitions[symbol] = self.DEAD
+                    return False
+                next_state = transitions[symbol] = self.state(current_set)
+            else:
+                current_set = next_entry[0]
+            state = next_state
+            thrashed = self.evictions - evictions
+            if thrashed > self.cache_size and thrashed * self.chars_per_eviction > position:
+                return self.simulate_nfa(current_set, input_string[position + 1:])
+        return self.cache[self.state(current_set)][1]
+
+    def simulate_many(self, strings):
+        """
+            Simulates a batch of strings in turn; they share the cache of built states.
+        """
+        return [self.simulate(string) for string in strings]
+
+    def simulate_nfa(self, current_set, input_string):
+        """
+            Plain NFA simulation over state sets, used as the fallback when the DFA cache thrashes.
+        """
+        for character in input_string:
+            symbol = self.symbol_map.get(character)
+            if symbol is None:
+                return False
+            current_set = self.move(current_set, symbol)
+            if not current_set:
+                return False
+        return any(state in self.nfa.accepts for state in current_set)
+
+def product_alphabet(dfas):
+    """
+        Common refinement of the alphabets of dfas: codepoint classes on each of which every DFA reads a single
+        symbol (or none, and dies). Returns a list of (range tuple, representative character, tuple of each DFA's
+        symbol or None) whose ranges cover all of [0, MAX_CODEPOINT]. The representative is printable ASCII when
+        the class has any.
+    """
+    maps = []
+    bounds = {0, MAX_CODEPOINT + 1}
+    for dfa in dfas:
+        ranges = dfa.symbol_ranges()
+        maps.append((sorted(dfa.alphabet), shared_symbol_map(tuple(ranges))))
+        for label in ranges:
+            for low, high in label:
+                bounds.update((low, high + 1))
+    bounds = sorted(bounds)
+    segments = {}  # tuple of symbols -> [(low, high)], in codepoint order
+    for low, next_low in zip(bounds, bounds[1:]):
+        key = []
+        for symbols, symbol_map in maps:
+            index = symbol_map.lookup(low)
+            key.append(None if index is None else symbols[index])
+        segments.setdefault(tuple(key), []).append((low, next_low - 1))
+    classes = []
+    for key, label in segments.items():
+        printable = [max(low, 0x21) for low, high in label if low <= 0x7e and high >= 0x21]
+        classes.append((normalize_ranges(label), chr(printable[0] if printable else label[0][0]), key))
+    return classes
+
+# Product of DFAs explored on the fly: its states are tuples with one state per DFA, None once that DFA has died
+class ProductDFA:
+    def __init__(self, dfas, accept):
+        """
+            accept maps the tuple of per-DFA acceptance flags of a product state to whether the product accepts it
+            (all for intersection, any for union, ...). Moves go over the classes of product_alphabet(dfas).
+        """
+        self.dfas = dfas
+        self.accept = accept
+        self.classes = product_alphabet(dfas)
+        self.start = tuple(dfa.start for dfa in dfas)
+        self.live = {}  # Tuple of which DFAs have died -> whether accept can still hold
+
+    def accepting(self, state):
+        return bool(self.accept(tuple(current is not None and current in dfa.accepts for current, dfa in zip(state, self.dfas))))
+
+    def alive(self, state):
+        """
+            False when accept cannot hold whatever the DFAs that are still running do, so no string through state is
+            accepted (for example once either DFA of an intersection has died). Such states are never expanded.
+        """
+        dead = tuple(current is None for current in state)
+        alive = self.live.get(dead)
+        if alive is None:
+            flags = product(*[(False,) if died else (False, True) for died in dead])
+            alive = self.live[dead] = any(self.accept(accepted) for accepted in flags)
+        return alive
+
+    def successors(self, state):
+        """
+            Yields (class, next state) for every class.
+        """
+        for index, (_, _, symbols) in enumerate(self.classes):
+            yield index, tuple(None if current is None or symbol is None else dfa.transitions.get((current, symbol))
+                               for current, symbol, dfa in zip(state, symbols, self.dfas))
+
+    def shortest_witness(self):
+        """
+            A shortest string the product accepts, or None. Breadth-first from the start state; the search stops at
+            the first accepting state and skips states that are not alive, so it usually sees a small part of the
+            product.
+        """
+        parents = {self.start: None}  # state -> (previous state, class) on a shortest path from the start
+        queue = deque([self.start])
+        while queue:
+            state = queue.popleft()
+            if self.accepting(state):
+                characters = []
+                while parents[state] is not None:
+                    state, index = parents[state]
+                    characters.append(self.classes[index][1])
+                return ''.join(reversed(characters))
+            if not self.alive(state):
+                continue
+            for index, next_state in self.successors(state):
+                if next_state not in parents:
+                    parents[next_state] = (state, index)
+                    queue.append(next_state)
+        return None
+
+    def to_dfa(self):
+        """
+            The reachable part of the product as a DFA over the classes, numbered in BFS order. States that are not
+            alive are left out (their transitions go to the implicit dead state).
+        """
+        numbering = {self.start: 0}
+        order = [self.start]
+        transitions = {}
+        accepts = set()
+        for state in order:
+            if self.accepting(state):
+                accepts.add(numbering[state])
+            if not self.alive(state):
+                continue
+            for index, next_state in self.successors(state):
+                if not self.alive(next_state):
+                    continue
+                if next_state not in numbering:
+                    numbering[next_state] = len(order)
+                    order.append(next_state)
+                transitions[(numbering[state], index)] = numbering[next_state]
+        ranges = [label for label, _, _ in self.classes]
+        return DFA(set(range(len(order))), set(range(len(ranges))), transitions, 0, accepts, ranges=ranges)
 
 # Main function to convert regex to DFA
-def regex_to_dfa(regex):
+def regex_to_dfa(regex, minimize=False):
     nfa = build_nfa(regex)
     dfa = nfa_to_dfa(nfa)
+    if minimize:  # Optional Hopcroft minimization stage
+        dfa = dfa.minimize()
+    return dfa
+
+# Compile a list of regexes into one DFA whose accepting states carry the IDs of the matching patterns
+def regex_set_to_dfa(patterns, minimize=False):
+    nfa = build_nfa_set(patterns)
+    dfa = nfa_to_dfa(nfa)
+    if minimize:
+        dfa = dfa.minimize()
     return dfa
 
+# Compiled DFAs keyed by regex: an in-process LRU in front of an optional on-disk cache of DFATable files
+class DFACache:
+    def __init__(self, directory=None, size=256, minimize=False):
+        self.directory = directory  # Where compiled tables are stored, or None for an in-process cache only
+        self.size = size
+        self.minimize = minimize
+        self.entries = OrderedDict()  # regex -> DFATable, in LRU order
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def path(self, regex):
+        key = hashlib.sha256(f"{DFATable.MAGIC}:{int(self.minimize)}:{regex}".encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + '.dfa')
+
+    def get(self, regex):
+        """
+            Returns the compiled DFATable for regex (it has simulate and simulate_many): from memory, else mapped
+            from disk, else compiled (and written to disk). A mapped table is used as it is, with no per-process copy
+            of its transitions, so processes that load the same file share its pages; use DFA.from_table for the
+            operations that need a DFA.
+        """
+        table = self.entries.get(regex)
+        if table is not None:
+            self.entries.move_to_end(regex)
+            return table
+        if self.directory is not None and os.path.exists(self.path(regex)):
+            table = DFATable.load(self.path(regex))
+        else:
+            table = regex_to_dfa(regex, minimize=self.minimize).compact()
+            if self.directory is not None:
+                table.save(self.path(regex))
+        self.entries[regex] = table
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return table
+
+# Compile many regexes in parallel. Every compilation has its own NFABuilder, so no state is shared between workers
+def compile_many(patterns, workers=None, processes=False, minimize=False):
+    """
+        Returns the DFAs of all patterns, in order. Uses a thread pool by default, or a process pool with processes=True
+        (pure-Python compilation is CPU bound, so processes are what actually run in parallel).
+    """
+    patterns = list(patterns)
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(patterns) // (4 * workers))  # A few chunks per worker keeps process-pool overhead low
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor(max_workers=workers) as pool:
+        return list(pool.map(partial(regex_to_dfa, minimize=minimize), patterns, chunksize=chunksize))
+
 # Test the implementation
 def test():
 
@@ -1,19 +1,49 @@
+from collections import Counter, deque
+try:  # NumPy is only needed for the batched PDA.simulate_many fast path
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_MAX_STEPS = 10 ** 6  # Configurations simulate and trace expand before giving up
+
 class PDA:
-    def __init__(self):
+    __slots__ = ('states', 'input_alphabet', 'stack_alphabet', 'transitions', 'start_state', 'accept_state', 'stack_start', 'fast', 'moves')
+
+    def __init__(self, transitions=None, start_state='q0', accept_state='q_accept', stack_start='Z', fast=True):
         # Define states
         self.states = {'q0', 'q1', 'q2', 'q_accept'}
         # Define input alphabet
         self.input_alphabet = {'a', 'b'}
         # Define stack alphabet (including bottom marker Z)
         self.stack_alphabet = {'a', 'b', 'Z'}
-        # Transition function (simplified as a dictionary of tuples)
+        # Transition relation: (state, input symbol or None, stack top to pop or None) -> (next_state, symbols to push)
+        # or a list of such pairs when the PDA is nondeterministic; the last pushed symbol becomes the new top
         self.transitions = {}
         # Start state
-        self.start_state = 'q0'
+        self.start_state = start_state
         # Accept state
-        self.accept_state = 'q_accept'
+        self.accept_state = accept_state
         # Initial stack symbol
-        self.stack_start = 'Z'
+        self.stack_start = stack_start
+        # The default machine has a specialised fast path (see is_odd_palindrome); fast=False forces the stack simulation
+        self.fast = fast and transitions is None
+        if transitions is None:
+            self.configure_transitions()  # Default machine: odd-length palindromes over {a, b}
+        else:
+            self.transitions = dict(transitions)
+            self.states = {start_state, accept_state}
+            self.input_alphabet = set()
+            self.stack_alphabet = {stack_start}
+            for (state, symbol, top), moves in self.transitions.items():
+                self.states.add(state)
+                if symbol is not None:
+                    self.input_alphabet.add(symbol)
+                if top is not None:
+                    self.stack_alphabet.add(top)
+                for next_state, push in self.moves_of(moves):
+                    self.states.add(next_state)
+                    self.stack_alphabet.update(push)
+        self.compile_transitions()
 
     def configure_transitions(self):
         # q0: Push first half
@@ -30,88 +60,330 @@ class PDA:
         # q2 to q_accept: Accept if stack is at Z
         self.transitions[('q2', None, 'Z')] = ('q_accept', [])  # Pop Z, accept
 
-    def simulate(self, input_string):
-        # Check if length is odd
+    @staticmethod
+    def moves_of(value):
+        """
+            A transition value is either one (next_state, push) pair or a list of them.
+        """
+        if isinstance(value, tuple) and len(value) == 2 and not isinstance(value[0], tuple):
+            return [value]
+        return list(value)
+
+    def compile_transitions(self):
+        """
+            Normalizes the transition table once (instead of on every simulate call): every key maps to a tuple of
+            (next_state, push tuple) moves.
+        """
+        self.moves = {key: tuple((next_state, tuple(push)) for next_state, push in self.moves_of(value))
+                      for key, value in self.transitions.items()}
+
+    def run(self, input_string, max_steps=None):
+        """
+            Runs the PDA as written, exploring its configurations (state, input position, stack) breadth first, so
+            epsilon moves and nondeterministic choices are all followed. Stacks are hash-consed: every distinct
+            stack is an integer ID (0 is the empty stack), which makes the visited-configuration check O(1) and
+            removes duplicate configurations exactly. Accepts by final state after reading the whole input.
+            Returns True or False, or None if max_steps configurations were expanded without reaching a verdict
+            (max_steps=None means no budget, which is only safe for machines without unbounded epsilon pushing;
+            simulate and trace default to DEFAULT_MAX_STEPS instead).
+        """
+        moves = self.moves
+        length = len(input_string)
+        # Hash-consed stacks: ID -> top symbol and ID of the stack below it
+        tops = [None]
+        below = [0]
+        stack_ids = {}  # (symbol, ID below) -> ID
+
+        def push(stack, symbols):
+            for symbol in symbols:
+                key = (symbol, stack)
+                if key not in stack_ids:
+                    stack_ids[key] = len(tops)
+                    tops.append(symbol)
+                    below.append(stack)
+                stack = stack_ids[key]
+            return stack
+
+        start = (self.start_state, 0, push(0, [self.stack_start]))
+        seen = {start}
+        queue = deque([start])
+        steps = 0
+        while queue:
+            if max_steps is not None and steps >= max_steps:
+                return None
+            steps += 1
+            state, position, stack = queue.popleft()
+            if state == self.accept_state and position == length:
+                return True
+            top = tops[stack]
+            symbol = input_string[position] if position < length else None
+            # Candidate moves: with or without consuming input, with or without popping the top
+            for read in ((symbol, None) if symbol is not None else (None,)):
+                next_position = position + 1 if read is not None else position
+                for pop in ((top, None) if top is not None else (None,)):
+                    base = below[stack] if pop is not None else stack
+                    for next_state, push_symbols in moves.get((state, read, pop), ()):
+                        configuration = (next_state, next_position, push(base, push_symbols))
+                        if configuration not in seen:
+                            seen.add(configuration)
+                            queue.append(configuration)
+        return False
+
+    def trace(self, input_string, max_steps=DEFAULT_MAX_STEPS, sample_every=1, max_samples=10000):
+        """
+            Instrumented copy of run (run and simulate stay uninstrumented, and the fast path is not used, so this
+            always traces the configuration search). Returns a dict with 'accepted' (as run, so None when the max_steps
+            budget ran out; max_steps=None removes it), 'steps' (configurations expanded), 'state_visits' (Counter of
+            expanded configurations per state), 'max_stack_depth' and 'trace', a sample of (step, state, input
+            position, stack top) taken every sample_every steps, at most max_samples.
+        """
+        moves = self.moves
         length = len(input_string)
-        if length % 2 == 0:  # Even length, reject immediately
-            return False
-        
-        # Initialize current state and stack
-        current_state = self.start_state
-        stack = [self.stack_start]
-        
-        # Configure transitions before simulation
-        self.configure_transitions()
-        
-        # Push first (length - 1) // 2 characters
-        i = 0
-        half = (length - 1) // 2  # Number of characters to push
-        while i < half:
-            symbol = input_string[i]
-            if symbol not in self.input_alphabet:
-                return False
-            # Push transition
-            transition = self.transitions.get(('q0', symbol, None))
-            if transition:
-                next_state, stack_action = transition
-                current_state = next_state
-                stack.extend(stack_action)
-            else:
-                return False
-            i += 1
-        
-        # Middle transition (consume middle character)
-        if i < length:
-            # Move to q1
-            transition = self.transitions.get(('q0', None, None))
-            if transition:
-                next_state, stack_action = transition
-                current_state = next_state
-            else:
-                return False
-            
-            # Consume middle character
-            symbol = input_string[i]
-            if symbol not in self.input_alphabet:
-                return False
-            top_stack = stack[-1] if stack else None
-            transition = self.transitions.get(('q1', symbol, None))
-            if transition:
-                next_state, stack_action = transition
-                current_state = next_state
-            else:
-                return False
-            i += 1
-        
-        # Pop and match the rest
-        while i < length:
-            symbol = input_string[i]
-            if symbol not in self.input_alphabet:
-                return False
-            top_stack = stack[-1] if stack else None
-            transition = self.transitions.get(('q2', symbol, top_stack))
-            if transition:
-                next_state, stack_action = transition
-                current_state = next_state
-                if top_stack in self.input_alphabet:
-                    stack.pop()
-            else:
-                return False
-            i += 1
-        
-        # Final checks
-        while current_state == 'q2':
-            top_stack = stack[-1] if stack else None
-            transition = self.transitions.get(('q2', None, top_stack))
-            if transition:
-                next_state, stack_action = transition
-                current_state = next_state
-                if top_stack == 'Z':
+        tops = [None]
+        below = [0]
+        depths = [0]
+        stack_ids = {}
+
+        def push(stack, symbols):
+            for symbol in symbols:
+                key = (symbol, stack)
+                if key not in stack_ids:
+                    stack_ids[key] = len(tops)
+                    tops.append(symbol)
+                    below.append(stack)
+                    depths.append(depths[stack] + 1)
+                stack = stack_ids[key]
+            return stack
+
+        start = (self.start_state, 0, push(0, [self.stack_start]))
+        seen = {start}
+        queue = deque([start])
+        steps = 0
+        visits = Counter()
+        max_depth = 0
+        samples = []
+        accepted = False
+        while queue:
+            if max_steps is not None and steps >= max_steps:
+                accepted = None
+                break
+            state, position, stack = queue.popleft()
+            if steps % sample_every == 0 and len(samples) < max_samples:
+                samples.append((steps, state, position, tops[stack]))
+            steps += 1
+            visits[state] += 1
+            max_depth = max(max_depth, depths[stack])
+            if state == self.accept_state and position == length:
+                accepted = True
+                break
+            top = tops[stack]
+            symbol = input_string[position] if position < length else None
+            for read in ((symbol, None) if symbol is not None else (None,)):
+                next_position = position + 1 if read is not None else position
+                for pop in ((top, None) if top is not None else (None,)):
+                    base = below[stack] if pop is not None else stack
+                    for next_state, push_symbols in moves.get((state, read, pop), ()):
+                        configuration = (next_state, next_position, push(base, push_symbols))
+                        if configuration not in seen:
+                            seen.add(configuration)
+                            queue.append(configuration)
+        return {'accepted': accepted, 'steps': steps, 'state_visits': visits, 'max_stack_depth': max_depth, 'trace': samples}
+
+    def simulate(self, input_string, max_steps=DEFAULT_MAX_STEPS):
+        """
+            Whether the PDA accepts input_string (False when max_steps configurations were expanded without a
+            verdict, like TuringMachine.simulate on an UNKNOWN run; use run to tell the two apart).
+        """
+        if self.fast:
+            return is_odd_palindrome(input_string)
+        return self.run(input_string, max_steps) is True
+
+    def simulate_many(self, strings, max_steps=DEFAULT_MAX_STEPS):
+        """
+            Simulates a batch of strings. The default machine with NumPy checks the whole batch with a few array
+            operations and returns a boolean array; otherwise every string is simulated in turn, each with its own
+            max_steps budget.
+        """
+        if self.fast and np is not None:
+            return odd_palindromes_many(strings)
+        return [self.simulate(string, max_steps) for string in strings]
+
+# Odd palindromes over {a, b}: the language of the default PDA, decided without a stack
+def to_bytes(string):
+    """
+        The input as bytes, or None if it holds a character outside ASCII (so it cannot be over {a, b}).
+    """
+    if isinstance(string, str):
+        return string.encode('ascii') if string.isascii() else None
+    return bytes(string)  # bytes, bytearray, memoryview
+
+def is_odd_palindrome(string):
+    """
+        Same verdict as the stack simulation of the default PDA, in one pass of C-level bytes operations: the length
+        is odd, no byte is left after deleting a and b, and the first half equals the reversed second half.
+    """
+    data = to_bytes(string)
+    if data is None or len(data) % 2 == 0 or data.translate(None, b'ab'):
+        return False
+    half = len(data) // 2
+    return data[:half] == data[:half:-1]
+
+def odd_palindromes_many(strings):
+    """
+        Vectorized is_odd_palindrome: the batch is concatenated into one byte array and every byte is compared with
+        its mirror (2 * offset + length - 1 - position) in its own string; strings with any mismatch or any byte
+        other than a and b are rejected.
+    """
+    strings = list(strings)
+    joined = ''.join(strings) if all(isinstance(string, str) for string in strings) else None
+    if joined is not None and joined.isascii():
+        # Common case: one encode for the whole batch
+        ascii = np.ones(len(strings), dtype=bool)
+        lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+        data = np.frombuffer(joined.encode('ascii'), dtype=np.uint8)
+    else:
+        encoded = [to_bytes(string) for string in strings]
+        ascii = np.array([data is not None for data in encoded], dtype=bool)
+        encoded = [data if data is not None else b'' for data in encoded]
+        lengths = np.array([len(data) for data in encoded], dtype=np.int64)
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    offsets = np.zeros(len(strings), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    owner = np.repeat(np.arange(len(strings)), lengths)
+    mirror = 2 * offsets[owner] + lengths[owner] - 1 - np.arange(len(data))
+    bad = (data != data[mirror]) | ((data != ord('a')) & (data != ord('b')))
+    return ascii & (lengths % 2 == 1) & (np.bincount(owner[bad], minlength=len(strings)) == 0)
+
+class CFG:
+    def __init__(self, productions, start_symbol='S'):
+        """
+            productions maps each nonterminal to its alternatives; an alternative is a sequence of symbols (a string
+            such as "aSa" is read one character per symbol, "" is the empty production). Every symbol that is not a
+            key of productions is a terminal.
+        """
+        self.productions = {lhs: [tuple(rhs) for rhs in alternatives] for lhs, alternatives in productions.items()}
+        self.start_symbol = start_symbol
+        self.nonterminals = set(self.productions)
+        self.terminals = {symbol for alternatives in self.productions.values() for rhs in alternatives
+                          for symbol in rhs if symbol not in self.nonterminals}
+        if start_symbol not in self.nonterminals:
+            raise ValueError(f"Start symbol {start_symbol!r} has no productions")
+        # Numbered rules, and the rule numbers of every nonterminal
+        self.rules = [(lhs, rhs) for lhs, alternatives in self.productions.items() for rhs in alternatives]
+        self.rules_of = {lhs: [] for lhs in self.productions}
+        for index, (lhs, rhs) in enumerate(self.rules):
+            self.rules_of[lhs].append(index)
+        # Nonterminals that derive the empty string (fixpoint)
+        self.nullable = set()
+        changed = True
+        while changed:
+            changed = False
+            for lhs, rhs in self.rules:
+                if lhs not in self.nullable and all(symbol in self.nullable for symbol in rhs):
+                    self.nullable.add(lhs)
+                    changed = True
+
+    def left_recursive(self):
+        """
+            Nonterminals that can derive a sentential form starting with themselves (directly, through other
+            nonterminals, or behind nullable ones), in sorted order.
+        """
+        # A -> B when some rule of A is A -> x B y with every symbol of x nullable
+        leftmost = {lhs: set() for lhs in self.productions}
+        for lhs, rhs in self.rules:
+            for symbol in rhs:
+                if symbol in self.nonterminals:
+                    leftmost[lhs].add(symbol)
+                if symbol not in self.nullable:
+                    break
+        found = []
+        for nonterminal in self.productions:
+            seen = set()
+            pending = list(leftmost[nonterminal])
+            while pending:
+                symbol = pending.pop()
+                if symbol == nonterminal:
+                    found.append(nonterminal)
                     break
-            else:
-                return False
-        
-        return current_state == self.accept_state and len(stack) == 1 and stack[0] == 'Z'
+                if symbol not in seen:
+                    seen.add(symbol)
+                    pending.extend(leftmost[symbol])
+        return sorted(found)
+
+    def to_pda(self):
+        """
+            Standard grammar-to-PDA construction: push the start symbol on the bottom marker, then in one loop state
+            replace a nonterminal on top of the stack by one of its right-hand sides, or pop a terminal that matches
+            the input; accept when only the bottom marker is left. The result is nondeterministic. Left-recursive
+            grammars would make it push forever without reading input, so they raise ValueError (use recognize()).
+        """
+        left_recursive = self.left_recursive()
+        if left_recursive:
+            raise ValueError(f"Grammar is left-recursive in {', '.join(map(repr, left_recursive))}; "
+                             "its PDA would never halt, use recognize() instead")
+        bottom = 'Z'
+        while bottom in self.nonterminals or bottom in self.terminals:
+            bottom += "'"
+        transitions = {('q_start', None, None): ('q_loop', [self.start_symbol])}
+        for lhs, alternatives in self.productions.items():
+            # The last pushed symbol becomes the top, so push the right-hand side reversed
+            transitions[('q_loop', None, lhs)] = [('q_loop', list(reversed(rhs))) for rhs in alternatives]
+        for terminal in self.terminals:
+            transitions[('q_loop', terminal, terminal)] = ('q_loop', [])
+        transitions[('q_loop', None, bottom)] = ('q_accept', [])
+        return PDA(transitions, start_state='q_start', accept_state='q_accept', stack_start=bottom)
+
+    def recognize(self, tokens):
+        """
+            Earley recognizer: whether the grammar derives tokens (a string or any sequence of terminals). Items are
+            (rule, dot, origin) and each Earley set is deduplicated, so it runs in O(n^3) time for any grammar and
+            O(n^2) for unambiguous ones, including left-recursive grammars. Nullable nonterminals are handled by
+            advancing over them at prediction time (Aycock and Horspool).
+        """
+        rules = self.rules
+        rules_of = self.rules_of
+        nullable = self.nullable
+        length = len(tokens)
+        items = [[] for _ in range(length + 1)]
+        seen = [set() for _ in range(length + 1)]
+        waiting = [{} for _ in range(length + 1)]  # Set k: nonterminal -> items in set k with the dot before it
+
+        def add(k, item):
+            if item not in seen[k]:
+                seen[k].add(item)
+                items[k].append(item)
+
+        for rule in rules_of[self.start_symbol]:
+            add(0, (rule, 0, 0))
+        for k in range(length + 1):
+            current = items[k]
+            token = tokens[k] if k < length else None
+            index = 0
+            while index < len(current):
+                item = current[index]
+                index += 1
+                rule, dot, origin = item
+                lhs, rhs = rules[rule]
+                if dot == len(rhs):
+                    # Complete: advance every item in the origin set that was waiting for lhs
+                    for waiting_rule, waiting_dot, waiting_origin in waiting[origin].get(lhs, ()):
+                        add(k, (waiting_rule, waiting_dot + 1, waiting_origin))
+                    continue
+                symbol = rhs[dot]
+                if symbol in rules_of:
+                    # Predict
+                    waiting[k].setdefault(symbol, []).append(item)
+                    for predicted in rules_of[symbol]:
+                        add(k, (predicted, 0, k))
+                    if symbol in nullable:
+                        add(k, (rule, dot + 1, origin))
+                elif symbol == token:
+                    # Scan
+                    add(k + 1, (rule, dot + 1, origin))
+            if k < length and not items[k + 1]:
+                return False  # No item survived the scan, so no longer prefix can be derived either
+        return any(origin == 0 and rules[rule][0] == self.start_symbol and dot == len(rules[rule][1])
+                   for rule, dot, origin in items[length])
 
 # Test the implementation
 def test():
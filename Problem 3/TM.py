@@ -1,5 +1,37 @@
+import json
+import sys
+import time
+from collections import Counter
+from functools import lru_cache
+
+# Verdicts of a run
+ACCEPT = 'ACCEPT'
+REJECT = 'REJECT'
+UNKNOWN = 'UNKNOWN'  # The run was stopped (step budget, timeout or a detected cycle) before the machine halted
+
+class TMResult:
+    __slots__ = ('verdict', 'reason', 'steps')
+
+    def __init__(self, verdict, reason, steps):
+        self.verdict = verdict
+        # 'accept state', 'reject state', 'no transition', 'invalid symbol', 'step budget', 'timeout', 'cycle' or
+        # 'unbounded sweep'
+        self.reason = reason
+        self.steps = steps
+
+    def __bool__(self):
+        return self.verdict == ACCEPT
+
+    def __eq__(self, other):
+        return isinstance(other, TMResult) and (self.verdict, self.reason, self.steps) == (other.verdict, other.reason, other.steps)
+
+    def __repr__(self):
+        return f"TMResult({self.verdict!r}, {self.reason!r}, {self.steps})"
+
 class TuringMachine:
-    def __init__(self):
+    __slots__ = ('states', 'input_alphabet', 'tape_alphabet', 'transitions', 'start_state', 'accept_state', 'reject_state', 'compiled')
+
+    def __init__(self, definition=None):
         # Define states
         self.states = {'q0', 'q1', 'q2', 'q3', 'q4', 'q5', 'q6', 'q_accept', 'q_reject'}
         # Define input alphabet
@@ -13,8 +45,13 @@ class TuringMachine:
         # Accept and reject states
         self.accept_state = 'q_accept'
         self.reject_state = 'q_reject'
-        # Configure transitions
-        self.configure_transitions()
+        # Configure transitions: the built-in machine, or one loaded from a table (see parse_machine)
+        if definition is None:
+            self.configure_transitions()
+        else:
+            self.configure_definition(definition)
+        # Integer-encoded form of the machine, built on first use (see compile)
+        self.compiled = None
 
     def configure_transitions(self):
         # q0: Check if tape is empty or start processing
@@ -76,7 +113,129 @@ class TuringMachine:
         self.transitions[('q6', 'Z')] = ('q6', 'Z', 'L')
         self.transitions[('q6', '_')] = ('q_accept', '_', 'R')  # Fully marked, accept
 
-    def simulate(self, input_string):
+    def configure_definition(self, definition):
+        """
+            Loads a machine description (the dict read from JSON or produced by parse_machine) after validating it.
+            Keys: 'input' and 'tape' (alphabets, as strings or lists of one-character symbols; '_' is the blank and
+            is always on the tape), 'start', 'accept', 'reject', and 'transitions', a list of
+            [state, read, next_state, write, move] rules with move L, R or S (stay). A read of '*' is a wildcard for
+            every tape symbol the state has no rule for, and a write of '*' writes back the symbol that was read.
+            Raises ValueError on a malformed machine.
+        """
+        for key in ('input', 'start', 'accept', 'reject', 'transitions'):
+            if key not in definition:
+                raise ValueError(f"Machine definition is missing {key!r}")
+        self.input_alphabet = set(definition['input'])
+        self.tape_alphabet = set(definition.get('tape', ())) | self.input_alphabet | {'_'}
+        self.start_state = definition['start']
+        self.accept_state = definition['accept']
+        self.reject_state = definition['reject']
+        if self.accept_state == self.reject_state:
+            raise ValueError("The accept and reject states must differ")
+        if '_' in self.input_alphabet or WILDCARD in self.tape_alphabet:
+            raise ValueError(f"'_' (blank) and {WILDCARD!r} (wildcard) cannot be input or tape symbols")
+        for symbol in self.tape_alphabet:
+            if not isinstance(symbol, str) or len(symbol) != 1:
+                raise ValueError(f"Tape symbols must be single characters, got {symbol!r}")
+        if len(self.tape_alphabet) > 254:
+            raise ValueError("At most 254 tape symbols are supported")
+        
+        self.transitions = {}
+        wildcards = {}
+        for number, rule in enumerate(definition['transitions'], 1):
+            if len(rule) != 5:
+                raise ValueError(f"Rule {number}: expected [state, read, next_state, write, move], got {rule!r}")
+            state, read, next_state, write, move = (sys.intern(field) if isinstance(field, str) else field for field in rule)
+            if state in (self.accept_state, self.reject_state):
+                raise ValueError(f"Rule {number}: halting state {state!r} cannot have transitions")
+            if move not in MOVES:
+                raise ValueError(f"Rule {number}: move must be one of {', '.join(MOVES)}, got {move!r}")
+            for symbol in (read, write):
+                if symbol != WILDCARD and symbol not in self.tape_alphabet:
+                    raise ValueError(f"Rule {number}: {symbol!r} is not a tape symbol")
+            if write == WILDCARD and read != WILDCARD:
+                write = read
+            rules = wildcards if read == WILDCARD else self.transitions
+            key = state if read == WILDCARD else shared(state, read)
+            if key in rules:
+                raise ValueError(f"Rule {number}: duplicate rule for state {state!r} reading {read!r}")
+            rules[key] = shared(next_state, write, move)
+        # Expand the wildcards over the symbols their state has no explicit rule for
+        for state, (next_state, write, move) in wildcards.items():
+            for symbol in self.tape_alphabet:
+                if (state, symbol) not in self.transitions:
+                    self.transitions[shared(state, symbol)] = shared(next_state, symbol if write == WILDCARD else write, move)
+        self.states = {self.start_state, self.accept_state, self.reject_state}
+        self.states |= {state for (state, _) in self.transitions} | {next_state for (next_state, _, _) in self.transitions.values()}
+
+    def compile(self):
+        """
+            Returns the CompiledTM for this machine, building it the first time.
+        """
+        if self.compiled is None:
+            self.compiled = CompiledTM(self)
+        return self.compiled
+
+    def run(self, input_string, max_steps=None, timeout=None, macro=True):
+        """
+            Runs the compiled machine and returns a TMResult; see CompiledTM.run.
+        """
+        return self.compile().run(input_string, macro=macro, max_steps=max_steps, timeout=timeout)
+
+    def simulate(self, input_string, max_steps=None, timeout=None):
+        """
+            Whether the machine accepts input_string (False when the run was stopped with an UNKNOWN verdict).
+        """
+        return self.run(input_string, max_steps, timeout).verdict == ACCEPT
+
+    def trace(self, input_string, max_steps=None, sample_every=1, max_samples=10000, window=5):
+        """
+            Instrumented copy of interpret (run and simulate stay uninstrumented). Returns a dict with 'result' (the
+            TMResult interpret would give), 'state_visits' (Counter of steps taken per state), 'tape_extent' (lowest and
+            highest head position, the input starting at 0) and 'trace', a sample of (step, state, head, tape window)
+            taken every sample_every steps, at most max_samples, where the window is the window cells on each side of
+            the head.
+        """
+        visits = Counter()
+        samples = []
+        lowest = highest = 0
+        if any(char not in self.input_alphabet for char in input_string):
+            result = TMResult(REJECT, 'invalid symbol', 0)
+        else:
+            tape = dict(enumerate(input_string))
+            head = 0
+            current_state = self.start_state
+            steps = 0
+            while True:
+                if current_state == self.accept_state:
+                    result = TMResult(ACCEPT, 'accept state', steps)
+                    break
+                if current_state == self.reject_state:
+                    result = TMResult(REJECT, 'reject state', steps)
+                    break
+                if max_steps is not None and steps >= max_steps:
+                    result = TMResult(UNKNOWN, 'step budget', steps)
+                    break
+                transition = self.transitions.get((current_state, tape.get(head, '_')))
+                if transition is None:
+                    result = TMResult(REJECT, 'no transition', steps)
+                    break
+                if steps % sample_every == 0 and len(samples) < max_samples:
+                    cells = ''.join(tape.get(position, '_') for position in range(head - window, head + window + 1))
+                    samples.append((steps, current_state, head, cells))
+                visits[current_state] += 1
+                next_state, write_symbol, direction = transition
+                tape[head] = write_symbol
+                current_state = next_state
+                head += -1 if direction == 'L' else 1 if direction == 'R' else 0
+                lowest, highest = min(lowest, head), max(highest, head)
+                steps += 1
+        return {'result': result, 'state_visits': visits, 'tape_extent': (lowest, highest), 'trace': samples}
+
+    def interpret(self, input_string, max_steps=None):
+        """
+            Reference interpreter over the string transition table; returns a TMResult.
+        """
         # Initialize tape (dictionary for sparse representation)
         tape = {}
         for i, char in enumerate(input_string):
@@ -89,23 +248,26 @@ class TuringMachine:
         # Validate input
         for char in input_string:
             if char not in self.input_alphabet:
-                return False
+                return TMResult(REJECT, 'invalid symbol', 0)
         
         # Simulate TM
+        steps = 0
         while True:
             # Get current tape symbol (blank if position not in tape)
             tape_symbol = tape.get(head, '_')
             
             # Check if in accept or reject state
             if current_state == self.accept_state:
-                return True
+                return TMResult(ACCEPT, 'accept state', steps)
             if current_state == self.reject_state:
-                return False
+                return TMResult(REJECT, 'reject state', steps)
+            if max_steps is not None and steps >= max_steps:
+                return TMResult(UNKNOWN, 'step budget', steps)
             
             # Get transition
             transition = self.transitions.get((current_state, tape_symbol))
             if transition is None:
-                return False  # No transition, reject
+                return TMResult(REJECT, 'no transition', steps)  # No transition, reject
             
             # Apply transition
             next_state, write_symbol, direction = transition
@@ -118,6 +280,250 @@ class TuringMachine:
             elif direction == 'R':
                 head += 1
             # No need for 'H' as we halt on accept/reject
+            steps += 1
+
+@lru_cache(maxsize=1 << 16)
+def shared(*fields):
+    """
+        The one tuple kept for these fields: transitions and compiled table entries go through it, so the many
+        machines of a process share their identical (state, symbol) keys, rules and entries instead of each holding
+        copies.
+    """
+    return fields
+
+# Machine descriptions: a wildcard read matches any other tape symbol, and a wildcard write keeps the symbol read
+WILDCARD = '*'
+MOVES = ('L', 'R', 'S')
+
+def parse_machine(text):
+    """
+        Parses the text transition-table format into a machine definition (see TuringMachine.configure_definition):
+        one rule "state read next_state write move" per line (an optional "->" may separate the two halves),
+        directives "input: 0 1", "tape: X Y", "start: q0", "accept: q_accept", "reject: q_reject", and # comments.
+    """
+    definition = {'transitions': []}
+    for number, line in enumerate(text.splitlines(), 1):
+        fields = line.split('#', 1)[0].replace('->', ' ').split()
+        if not fields:
+            continue
+        if fields[0].endswith(':'):
+            key = fields[0][:-1]
+            if key in ('input', 'tape'):
+                definition[key] = fields[1:]
+            elif key in ('start', 'accept', 'reject') and len(fields) == 2:
+                definition[key] = fields[1]
+            else:
+                raise ValueError(f"Line {number}: unknown or malformed directive {line.strip()!r}")
+        elif len(fields) == 5:
+            definition['transitions'].append(fields)
+        else:
+            raise ValueError(f"Line {number}: expected 'state read next_state write move', got {line.strip()!r}")
+    return definition
+
+@lru_cache(maxsize=1024)
+def machine_from_text(text):
+    """
+        Validated and compiled machine for a JSON or text description. The result is cached by the text, so a
+        machine that is loaded again skips parsing, validation and compilation (treat it as read-only).
+    """
+    definition = json.loads(text) if text.lstrip().startswith('{') else parse_machine(text)
+    machine = TuringMachine(definition)
+    machine.compile()
+    return machine
+
+def load_machine(path):
+    """
+        Loads a machine description file (JSON or the text table format) through the machine_from_text cache.
+    """
+    with open(path, encoding='utf-8') as file:
+        return machine_from_text(file.read())
+
+class CompiledTM:
+    __slots__ = ('input_alphabet', 'symbols', 'symbol_ids', 'edge', 'width', 'states', 'start', 'halt', 'accept', 'reject',
+                 'stuck', 'edge_rows', 'table', 'sweep_rows', 'sweeps', 'macro_table')
+    CHECK_INTERVAL = 4096  # Minimum number of steps between checkpoints of run()
+    MACRO_FACTOR = 64  # Macro-steps cover many steps per loop iteration, so their checkpoints are further apart
+
+    def __init__(self, tm):
+        """
+            Integer-encoded TuringMachine. Tape symbols are small ints (blank is 0) and the tape is a bytearray
+            framed by an extra EDGE symbol on both sides. States are numbered so that the running states come first,
+            and every state is stored as its row offset (state * width) into one flat table. Each entry
+            table[row + symbol] is (next row, symbol to write, head move), a tuple shared with other machines through shared().
+            Rows at or past self.halt leave the inner loop: accept, reject, STUCK (no transition, which rejects
+            without taking a step) and EDGE + row (the head stepped onto the frame, so the tape has to grow before
+            state row can continue).
+            self.macro_table is the same table with every sweep entry (the state keeps itself and the symbol it
+            read, and moves the head) replaced by an exit to SWEEP + row, so that run(macro=True) can cross the
+            whole run of such symbols in one jump.
+        """
+        self.input_alphabet = set(tm.input_alphabet)
+        symbols = {'_'} | set(tm.tape_alphabet)
+        for (state, read), (next_state, write, _) in tm.transitions.items():
+            symbols.update((read, write))
+        self.symbols = ['_'] + sorted(symbols - {'_'})
+        self.symbol_ids = {symbol: index for index, symbol in enumerate(self.symbols)}
+        self.edge = len(self.symbols)
+        self.width = width = self.edge + 1
+        
+        halting = {tm.accept_state, tm.reject_state}
+        running = {tm.start_state} | {state for (state, _) in tm.transitions} | set(tm.states)
+        running |= {next_state for (next_state, _, _) in tm.transitions.values()}
+        self.states = sorted(running - halting) + [tm.accept_state, tm.reject_state]
+        rows = {state: index * width for index, state in enumerate(self.states)}
+        self.start = rows[tm.start_state]
+        self.halt = self.accept = rows[tm.accept_state]
+        self.reject = rows[tm.reject_state]
+        self.stuck = self.reject + width
+        self.edge_rows = self.stuck + width
+        
+        moves = {'L': -1, 'R': 1}
+        self.table = []
+        for state in self.states:
+            row = rows[state]
+            for symbol in range(width):
+                if symbol == self.edge:
+                    self.table.append(shared(self.edge_rows + row, symbol, 0))
+                    continue
+                transition = tm.transitions.get((state, self.symbols[symbol]))
+                if transition is None:
+                    self.table.append(shared(self.stuck, symbol, 0))
+                else:
+                    next_state, write, direction = transition
+                    self.table.append(shared(rows[next_state], self.symbol_ids[write], moves.get(direction, 0)))
+        
+        # Sweeps: per state, the symbols it walks over unchanged in each direction. The stop symbols are the rest,
+        # and EDGE is always among them, so the jump never leaves the tape
+        self.sweep_rows = self.edge_rows + self.halt
+        self.sweeps = {}
+        self.macro_table = list(self.table)
+        for row in range(0, self.halt, width):
+            for direction in (-1, 1):
+                walked = {symbol for symbol in range(self.edge) if self.table[row + symbol] == (row, symbol, direction)}
+                if not walked:
+                    continue
+                self.sweeps[(row, direction)] = bytes(symbol for symbol in range(width) if symbol not in walked)
+                for symbol in walked:
+                    self.macro_table[row + symbol] = shared(self.sweep_rows + row, symbol, 0)
+
+    def tape(self, input_string):
+        """
+            The initial tape: the encoded input with a blank and the EDGE frame on each side.
+        """
+        tape = bytearray([self.edge, 0])
+        tape += bytes(map(self.symbol_ids.__getitem__, input_string))
+        tape += bytes([0, self.edge])
+        return tape
+
+    def grow(self, tape, head):
+        """
+            Doubles the tape on the side whose EDGE frame the head is on; returns the new head position.
+        """
+        extra = len(tape)
+        if head == 0:
+            tape[0:1] = bytes([self.edge]) + bytes(extra)
+            return extra
+        tape[-1:] = bytes(extra) + bytes([self.edge])
+        return head
+
+    def sweep(self, tape, head, row):
+        """
+            Length of the run of symbols that state row walks over from head (whose symbol starts such a run):
+            the distance to the nearest stop symbol in the direction of the sweep, found with bytearray.find/rfind.
+        """
+        direction = self.table[row + tape[head]][2]
+        stops = self.sweeps[(row, direction)]
+        if direction > 0:
+            return min(position for position in (tape.find(stop, head) for stop in stops) if position >= 0) - head, 1
+        return head - max(tape.rfind(stop, 0, head) for stop in stops), -1
+
+    def configuration(self, tape, head, row):
+        """
+            The configuration with the tape trimmed of blanks and the head taken relative to the trimmed tape. A
+            TM's moves do not depend on where the head is in absolute terms, so if the same key comes back the run
+            repeats forever.
+        """
+        frame = bytes([0, self.edge])
+        left = len(tape) - len(tape.lstrip(frame))
+        content = tape.strip(frame)
+        return row, head - left if content else 0, content
+
+    def run(self, input_string, macro=True, max_steps=None, timeout=None, detect_cycles=True):
+        """
+            Runs the machine and returns a TMResult with the same verdict, reason and step count as
+            TuringMachine.interpret. With macro=True every self-loop sweep is crossed in one jump and counted as one
+            step per cell.
+            The hot loop runs in chunks of CHECK_INTERVAL steps (or the tape length, if longer, to amortize the
+            checks; MACRO_FACTOR times that with macro-steps). Between chunks the run is stopped with UNKNOWN once max_steps steps have been taken, once
+            timeout seconds have passed, or when the configuration repeats. Cycle detection follows Brent: the
+            configuration at one checkpoint is kept as an anchor. Each later checkpoint is compared with it, and the
+            anchor moves after 1, 2, 4, ... checkpoints. Every cycle is therefore found within a few of its periods,
+            at one tape comparison per chunk. With macro-steps, a sweep that walks over blanks and reaches the end of
+            the tape is also stopped, since it can never end.
+        """
+        if not set(input_string) <= self.input_alphabet:
+            return TMResult(REJECT, 'invalid symbol', 0)
+        table = self.macro_table if macro else self.table
+        halt = self.halt
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        tape = self.tape(input_string)
+        head = 2
+        row = self.start
+        steps = 0
+        limit = 0  # Step count of the next checkpoint
+        anchor = None
+        anchor_age = 0
+        anchor_lifetime = 1
+        while True:
+            if row >= halt:
+                if row >= self.sweep_rows:
+                    # Undo the pseudo-step, then jump over the run (but not past the next checkpoint): one step per
+                    # cell, tape and state unchanged
+                    steps -= 1
+                    row -= self.sweep_rows
+                    length, direction = self.sweep(tape, head, row)
+                    if detect_cycles and tape[head + direction * length] == self.edge and 0 not in self.sweeps[(row, direction)]:
+                        # The sweep walks over blanks too and only blanks lie past the frame: it never ends
+                        return TMResult(UNKNOWN, 'unbounded sweep', steps)
+                    length = min(length, limit - steps)
+                    steps += length
+                    head += direction * length
+                elif row >= self.edge_rows:
+                    # Undo the pseudo-step onto the frame, grow the tape, and resume
+                    steps -= 1
+                    row -= self.edge_rows
+                    head = self.grow(tape, head)
+                elif row == self.stuck:
+                    return TMResult(REJECT, 'no transition', steps - 1)
+                elif row == self.accept:
+                    return TMResult(ACCEPT, 'accept state', steps)
+                else:
+                    return TMResult(REJECT, 'reject state', steps)
+                continue
+            if steps >= limit:
+                # Checkpoint
+                if max_steps is not None and steps >= max_steps:
+                    return TMResult(UNKNOWN, 'step budget', steps)
+                if deadline is not None and time.monotonic() >= deadline:
+                    return TMResult(UNKNOWN, 'timeout', steps)
+                if detect_cycles:
+                    configuration = self.configuration(tape, head, row)
+                    if configuration == anchor:
+                        return TMResult(UNKNOWN, 'cycle', steps)
+                    anchor_age += 1
+                    if anchor_age >= anchor_lifetime:
+                        anchor, anchor_age, anchor_lifetime = configuration, 0, anchor_lifetime * 2
+                limit = steps + max(self.CHECK_INTERVAL, len(tape)) * (self.MACRO_FACTOR if macro else 1)
+                if max_steps is not None:
+                    limit = min(limit, max_steps)
+            # Hot loop: one table lookup per step until a row at or past halt (which is counted as a pseudo-step)
+            for steps in range(steps, limit):
+                if row >= halt:
+                    break
+                row, tape[head], move = table[row + tape[head]]
+                head += move
+            else:
+                steps = limit
 
 # Test the implementation
 def test():
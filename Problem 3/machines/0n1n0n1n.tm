@@ -0,0 +1,42 @@
+# L = {0^n 1^n 0^n 1^n | n >= 0}, the same machine as TuringMachine() in TM.py
+input: 0 1
+tape: X Y W Z
+start: q0
+accept: q_accept
+reject: q_reject
+
+# q0: Check if tape is empty or start processing
+q0 _ -> q_accept _ R
+q0 0 -> q1 X R
+q0 1 -> q_reject 1 R
+
+# q1: Move right to find first unmarked 1 (second block)
+q1 1 -> q2 Y R
+q1 _ -> q_reject _ R
+q1 * -> q1 * R
+
+# q2: Move right to find first unmarked 0 (third block)
+q2 0 -> q3 W R
+q2 _ -> q_reject _ R
+q2 * -> q2 * R
+
+# q3: Move right to find first unmarked 1 (fourth block)
+q3 1 -> q4 Z L
+q3 _ -> q_reject _ R
+q3 * -> q3 * R
+
+# q4: Move left to find start of tape
+q4 _ -> q5 _ R
+q4 * -> q4 * L
+
+# q5: Check if more unmarked 0, 1 exist
+q5 0 -> q1 X R
+q5 1 -> q_reject 1 R
+q5 _ -> q6 _ L
+q5 * -> q5 * R
+
+# q6: Verify tape is fully marked
+q6 0 -> q_reject 0 L
+q6 1 -> q_reject 1 L
+q6 _ -> q_accept _ R
+q6 * -> q6 * L
@@ -0,0 +1,573 @@
+import argparse
+import asyncio
+import gc
+import io
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+import problems  # Registers the "Problem N" directories as the packages Problem_N
+from Problem_1.regex_to_dfa_v2 import NFA, DFACache, LazyDFA, ProductDFA, build_nfa, nfa_to_dfa, parse, regex_set_to_dfa, regex_to_dfa  # Problem 1
+from Problem_2.pda_odd_palindrome import CFG, PDA  # Problem 2
+from Problem_3.TM import TuringMachine, machine_from_text, parse_machine  # Problem 3
+import run_machines  # Batch runner
+from serve_machines import MachineService  # Service
+
+def make_regex(operators):
+    """
+        Builds a pattern of repeated "(a|b)*a" units with roughly the requested number of operators (|, *, .).
+    """
+    units = max(1, operators // 4)
+    return "(a|b)*a" * units
+
+def count_operators(node):
+    """
+        Number of operators (implicit concatenations, |, *, +, ?, {m,n}) in an AST from parse().
+    """
+    kind = node[0]
+    if kind in ('set', 'empty'):
+        return 0
+    if kind in ('concat', 'union'):
+        return len(node[1]) - 1 + sum(count_operators(child) for child in node[1])
+    return 1 + count_operators(node[1])
+
+# Problem 1: Thompson construction should grow linearly with the number of operators
+def bench_build_nfa(sizes=(10, 100, 1000, 10000, 100000)):
+    print(f"{'operators':>10} {'states':>8} {'seconds':>10} {'us/op':>8}")
+    for size in sizes:
+        regex = make_regex(size)
+        operators = count_operators(parse(regex))
+        start = time.perf_counter()
+        nfa = build_nfa(regex)
+        elapsed = time.perf_counter() - start
+        print(f"{operators:>10} {len(nfa.states):>8} {elapsed:>10.4f} {elapsed / operators * 1e6:>8.2f}")
+
+def random_strings(count, length, alphabet='ab', seed=0):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(alphabet) for _ in range(length)) for _ in range(count)]
+
+# Problem 1: DFA size and simulate throughput before/after Hopcroft minimization
+def bench_minimize(patterns=("(a|b)*abb", "(ab|ba)*", "((a|b)(a|b))*", "(a|b)*a(a|b)(a|b)(a|b)(a|b)(a|b)"), count=20000, length=32):
+    strings = random_strings(count, length)
+    print(f"{'pattern':>34} {'states':>7} {'min':>5} {'MB/s':>7} {'min MB/s':>9}")
+    for regex in patterns:
+        dfa = regex_to_dfa(regex)
+        minimal = regex_to_dfa(regex, minimize=True)
+        rates = []
+        for machine in (dfa, minimal):
+            start = time.perf_counter()
+            for string in strings:
+                machine.simulate(string)
+            rates.append(count * length / (time.perf_counter() - start) / 1e6)
+        print(f"{regex:>34} {len(dfa.states):>7} {len(minimal.states):>5} {rates[0]:>7.2f} {rates[1]:>9.2f}")
+
+# Problem 1: minimization time against DFA size on a^n (spelled out: {n} counts stop at MAX_REPEAT), a chain in which
+# every split peels one state off a large block; the time per state should stay flat as n doubles (O(n log n) refinement)
+def bench_minimize_scaling(ns=(4000, 8000, 16000, 32000)):
+    print(f"{'states':>7} {'seconds':>9} {'us/state':>9}")
+    for n in ns:
+        dfa = regex_to_dfa("a" * n)
+        start = time.perf_counter()
+        dfa.minimize()
+        seconds = time.perf_counter() - start
+        print(f"{len(dfa.states):>7} {seconds:>9.4f} {seconds / len(dfa.states) * 1e6:>9.2f}")
+
+# Problem 1: per-string simulate vs batched simulate_many on many short strings
+def bench_simulate_many(regex="(a|b)*abb", count=200000, length=16):
+    dfa = regex_to_dfa(regex)
+    strings = random_strings(count, length)
+    print(f"{'path':>14} {'seconds':>8} {'MB/s':>7}")
+    for name, run in (("simulate", lambda: [dfa.simulate(string) for string in strings]),
+                      ("simulate_many", lambda: dfa.simulate_many(strings))):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:>14} {elapsed:>8.3f} {count * length / elapsed / 1e6:>7.2f}")
+
+# Problem 1: eager vs lazy DFA on (a|b)*a(a|b)^k, whose eager DFA has 2^(k+1) states
+def bench_lazy_dfa(ks=(6, 10, 14), count=2000, length=64):
+    strings = random_strings(count, length)
+    print(f"{'k':>3} {'eager states':>12} {'eager s':>8} {'lazy states':>11} {'lazy s':>8}")
+    for k in ks:
+        nfa = build_nfa("(a|b)*a" + "(a|b)" * k)
+        start = time.perf_counter()
+        dfa = nfa_to_dfa(nfa) if k <= 10 else None  # Beyond this the eager construction takes too long to be useful
+        for string in strings if dfa else ():
+            dfa.simulate(string)
+        eager = time.perf_counter() - start
+        lazy = LazyDFA(nfa, cache_size=4096)
+        start = time.perf_counter()
+        for string in strings:
+            lazy.simulate(string)
+        elapsed = time.perf_counter() - start
+        eager_states = len(dfa.states) if dfa else "-"
+        eager_time = f"{eager:.3f}" if dfa else "-"
+        print(f"{k:>3} {eager_states:>12} {eager_time:>8} {len(lazy.cache):>11} {elapsed:>8.3f}")
+
+# Problem 1: one pass of a multi-pattern DFA vs one simulate pass per pattern
+def bench_regex_set(pattern_count=200, count=2000, length=64):
+    words = random_strings(pattern_count, 6, seed=1)
+    patterns = ["(a|b)*" + word for word in words]  # Suffix patterns keep the combined DFA small
+    strings = random_strings(count, length)
+    start = time.perf_counter()
+    combined = regex_set_to_dfa(patterns, minimize=True)
+    compile_time = time.perf_counter() - start
+    singles = [regex_to_dfa(regex) for regex in patterns]
+    start = time.perf_counter()
+    for string in strings:
+        [index for index, single in enumerate(singles) if single.simulate(string)]
+    separate = time.perf_counter() - start
+    start = time.perf_counter()
+    for string in strings:
+        combined.matches(string)
+    together = time.perf_counter() - start
+    print(f"{pattern_count} patterns, {len(combined.states)} DFA states (compiled in {compile_time:.2f}s): "
+          f"per-pattern {separate:.3f}s, combined {together:.3f}s")
+
+# Problem 1: compiling a pattern vs mapping its cached table from disk
+def bench_dfa_cache(ks=(4, 8, 11)):
+    print(f"{'pattern':>24} {'states':>7} {'compile s':>10} {'load s':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for k in ks:
+            regex = "(a|b)*a" + "(a|b)" * k
+            start = time.perf_counter()
+            table = DFACache(directory).get(regex)
+            compile_time = time.perf_counter() - start
+            start = time.perf_counter()
+            DFACache(directory).get(regex)
+            load_time = time.perf_counter() - start
+            print(f"{'(a|b)*a(a|b)^' + str(k):>24} {table.dead:>7} {compile_time:>10.4f} {load_time:>8.4f}")
+
+# Problem 1: subset construction time on (a|b)*a(a|b)^k, which determinizes to 2^(k+1) + 1 states
+def bench_nfa_to_dfa(ks=(8, 10, 12, 13, 14)):
+    print(f"{'k':>3} {'DFA states':>10} {'seconds':>8}")
+    for k in ks:
+        nfa = build_nfa("(a|b)*a" + "(a|b)" * k)
+        start = time.perf_counter()
+        dfa = nfa_to_dfa(nfa)
+        print(f"{k:>3} {len(dfa.states):>10} {time.perf_counter() - start:>8.3f}")
+
+def expand_to_bytes(nfa):
+    """
+        Same NFA with every byte-range edge split into one edge per byte character (no alphabet compression).
+    """
+    transitions = {}
+    for (state, label), next_states in nfa.transitions.items():
+        if label is None:
+            transitions[(state, None)] = next_states
+            continue
+        for low, high in label:
+            for code in range(low, min(high, 255) + 1):
+                transitions.setdefault((state, chr(code)), set()).update(next_states)
+    alphabet = {label for (_, label) in transitions if label is not None}
+    return NFA(nfa.states, alphabet, transitions, nfa.start, nfa.accepts)
+
+# Problem 1: pattern analysis on (a|b)*a(a|b)^k, whose DFA has 2^(k+1) + 1 states: the lazy checks (overlap, subset_of,
+# equivalent) against building the whole product DFA and then testing it for emptiness
+def bench_product(ks=(8, 11, 13)):
+    print(f"{'k':>3} {'states':>7} {'check':>34} {'lazy ms':>9} {'full ms':>9}")
+    for k in ks:
+        dfa = regex_to_dfa("(a|b)*a" + "(a|b)" * k)
+        minimal = dfa.minimize()
+        shorter = regex_to_dfa("(a|b)*a" + "(a|b)" * (k - 1))
+        only_b = regex_to_dfa("b+")
+        only_a = regex_to_dfa("a+")
+        subsumed = regex_to_dfa("b*a" + "(a|b)" * k)
+        checks = [
+            ("overlap with b+ (none)", lambda: dfa.overlap(only_b), lambda: dfa.intersection(only_b).is_empty()),
+            ("overlap with a+ (a^(k+1))", lambda: dfa.overlap(only_a), lambda: dfa.intersection(only_a).is_empty()),
+            ("overlap with k-1 variant", lambda: dfa.overlap(shorter), lambda: dfa.intersection(shorter).is_empty()),
+            ("b*a(a|b)^k subset_of", lambda: subsumed.subset_of(dfa), lambda: subsumed.difference(dfa).is_empty()),
+            ("equivalent to its minimization", lambda: dfa.equivalent(minimal),
+             lambda: ProductDFA((dfa, minimal), lambda accepted: accepted[0] != accepted[1]).to_dfa().is_empty()),
+        ]
+        for name, lazy, full in checks:
+            timings = []
+            for check in (lazy, full):
+                start = time.perf_counter()
+                check()
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{k:>3} {len(dfa.states):>7} {name:>34} {timings[0]:>9.2f} {timings[1]:>9.2f}")
+
+# Problem 1: determinization time and table size with one column per byte vs one per equivalence class
+def bench_alphabet_classes(patterns=("[\\x00-\\xff]*[a-z0-9._%+-]+@[a-z0-9.-]+\\.[a-z]{2,4}",
+                                     "[^\\n]*(GET|POST|PUT) /[^ ]* HTTP/1\\.[01]",
+                                     "[\\x00-\\xff]*\\d{3}-\\d{4}[\\x00-\\xff]*")):
+    print(f"{'pattern':>44} {'columns':>8} {'classes':>8} {'per-byte s':>11} {'classes s':>10} {'table KB':>9} {'class KB':>9}")
+    for regex in patterns:
+        nfa = build_nfa(regex)
+        start = time.perf_counter()
+        per_byte = nfa_to_dfa(expand_to_bytes(nfa))
+        per_byte_time = time.perf_counter() - start
+        start = time.perf_counter()
+        classes = nfa_to_dfa(nfa)
+        classes_time = time.perf_counter() - start
+        sizes = [len(dfa.compile().table) * 4 / 1024 for dfa in (per_byte, classes)]
+        print(f"{regex[:44]:>44} {len(per_byte.alphabet):>8} {len(classes.alphabet):>8} {per_byte_time:>11.3f} "
+              f"{classes_time:>10.3f} {sizes[0]:>9.1f} {sizes[1]:>9.1f}")
+
+# Problem 2: configuration search over the compiled PDA vs the Earley recognizer (palindromes, then S -> SS | a,
+# which is ambiguous and left-recursive, so only Earley can run it)
+def bench_cfg(lengths=(25, 51, 101, 201)):
+    palindromes = CFG({'S': ["aSa", "bSb", "a", "b"]})
+    pda = palindromes.to_pda()
+    ambiguous = CFG({'S': ["SS", "a"]})
+    print(f"{'n':>5} {'PDA s':>8} {'Earley s':>9} {'S->SS|a s':>10}")
+    for length in lengths:
+        string = ("ab" * length)[:length]
+        timings = []
+        for run in (lambda: pda.run(string), lambda: palindromes.recognize(string), lambda: ambiguous.recognize("a" * length)):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        print(f"{length:>5} {timings[0]:>8.3f} {timings[1]:>9.3f} {timings[2]:>10.3f}")
+
+# Problem 2: stack simulation vs the odd-palindrome fast path, per string and batched
+def bench_pda_fast_path(count=200000, length=15):
+    halves = random_strings(count, length // 2)
+    strings = [half + "a" + half[::-1] if index % 2 else half + "ab" + half for index, half in enumerate(halves)]
+    slow, fast = PDA(fast=False), PDA()
+    print(f"{'path':>16} {'seconds':>8} {'MB/s':>7}")
+    sample = strings[:count // 20]  # The stack simulation only gets a slice of the batch
+    for name, batch, run in (("stack", sample, lambda: [slow.simulate(string) for string in sample]),
+                             ("fast simulate", strings, lambda: [fast.simulate(string) for string in strings]),
+                             ("simulate_many", strings, lambda: fast.simulate_many(strings))):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:>16} {elapsed:>8.3f} {len(batch) * length / elapsed / 1e6:>7.2f}")
+
+# Problem 3: step rate of the string-table interpreter vs the compiled machine (per step and with macro-steps)
+# on 0^n 1^n 0^n 1^n
+def bench_tm_compiled(ns=(100, 300, 1000, 3000)):
+    tm = TuringMachine()
+    compiled = tm.compile()
+    print(f"{'n':>5} {'steps':>9} {'interpret Mst/s':>16} {'compiled Mst/s':>15} {'macro Mst/s':>12}")
+    for n in ns:
+        string = "0" * n + "1" * n + "0" * n + "1" * n
+        rates = []
+        for run in (tm.interpret, lambda string: compiled.run(string, macro=False), compiled.run):
+            if run is tm.interpret and n > 1000:
+                rates.append(float('nan'))  # Too slow to be worth waiting for
+                continue
+            start = time.perf_counter()
+            steps = run(string).steps
+            rates.append(steps / (time.perf_counter() - start) / 1e6)
+        print(f"{n:>5} {steps:>9} {rates[0]:>16.2f} {rates[1]:>15.2f} {rates[2]:>12.2f}")
+
+def random_machine_text(rng, states=8, symbols="01XY"):
+    """
+        A random machine in the text table format, with one wildcard rule per state.
+    """
+    names = [f"q{index}" for index in range(states)]
+    lines = ["input: 0 1", f"tape: {' '.join(symbols)}", "start: q0", "accept: yes", "reject: no"]
+    for state in names:
+        for symbol in rng.sample(symbols + "_", 3):
+            lines.append(f"{state} {symbol} -> {rng.choice(names + ['yes', 'no'])} {rng.choice(symbols)} {rng.choice('LR')}")
+        lines.append(f"{state} * -> {rng.choice(names)} * {rng.choice('LR')}")
+    return "\n".join(lines)
+
+# Problem 3: loading machines from their text tables, the first time and from the cache
+def bench_tm_loader(count=500):
+    rng = random.Random(0)
+    texts = [random_machine_text(rng) for _ in range(count)]
+    machine_from_text.cache_clear()
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        for text in texts:
+            machine_from_text(text)
+        timings.append(time.perf_counter() - start)
+    print(f"{count} machines: parse+validate+compile {timings[0] / count * 1e6:.1f} us each, cached {timings[1] / count * 1e6:.2f} us each")
+
+# Batch runner: throughput of the TM over 0^n 1^n 0^n 1^n inputs with 1, 2, 4, ... worker processes
+def bench_batch_runner(count=4000, max_n=200):
+    rng = random.Random(0)
+    strings = ["0" * n + "1" * n + "0" * n + "1" * n for n in (rng.randrange(max_n) for _ in range(count))]
+    workers = [1]
+    while workers[-1] * 2 <= (os.cpu_count() or 1) * 2:
+        workers.append(workers[-1] * 2)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "inputs.txt")
+        with open(path, "w") as file:
+            file.write('\n'.join(strings) + '\n')
+        print(f"{'workers':>8} {'seconds':>8} {'inputs/s':>9}  ({os.cpu_count()} CPUs)")
+        for worker_count in workers:
+            start = time.perf_counter()
+            run_machines.main(["tm", path, "-w", str(worker_count), "-c", "64"], output=io.StringIO())
+            elapsed = time.perf_counter() - start
+            print(f"{worker_count:>8} {elapsed:>8.3f} {count / elapsed:>9.0f}")
+
+async def generate_load(socket_path, requests, connections=10, rate=None):
+    """
+        Load generator for serve_machines: sends the requests (dicts with distinct ids) over connections Unix-socket
+        connections, all at once or, with rate, paced at rate requests per second in total. Latency is measured from
+        the time a request was due, so a slow server cannot hide queueing by delaying the sender. Returns
+        ({id: response}, {id: latency in seconds}).
+    """
+    responses = {}
+    latencies = {}
+    streams = await asyncio.gather(*(asyncio.open_unix_connection(socket_path, limit=2 ** 24) for _ in range(connections)))
+    start = time.perf_counter()  # Once every connection is open, so connecting is not counted as latency
+
+    async def client(offset, share):
+        reader, writer = streams[offset]
+        due = {}
+
+        async def send():
+            for index, request in enumerate(share):
+                due[request['id']] = start + (index * connections + offset) / rate if rate else time.perf_counter()
+                delay = due[request['id']] - time.perf_counter()
+                if delay > 0:
+                    await writer.drain()
+                    await asyncio.sleep(delay)
+                writer.write((json.dumps(request) + '\n').encode())
+            await writer.drain()
+
+        sender = asyncio.create_task(send())
+        for _ in share:
+            response = json.loads(await reader.readline())
+            latencies[response['id']] = time.perf_counter() - due[response['id']]
+            responses[response['id']] = response
+        await sender
+        writer.close()
+
+    await asyncio.gather(*(client(index, requests[index::connections]) for index in range(connections)))
+    return responses, latencies
+
+def service_requests(count, seed=0):
+    """
+        A seeded mix of small DFA, PDA and TM requests.
+    """
+    rng = random.Random(seed)
+    requests = []
+    for index in range(count):
+        kind = ('dfa', 'pda', 'tm')[index % 3]
+        if kind == 'tm':
+            n = rng.randrange(6)
+            string = "0" * n + "1" * n + "0" * n + "1" * n
+        else:
+            string = ''.join(rng.choice("ab") for _ in range(rng.randrange(1, 16)))
+        requests.append({'id': index, 'machine': kind, 'regex': "(a|b)*abb", 'input': string})
+    return requests
+
+# Service: p50/p99 latency of small requests, for a burst of concurrent requests and for a steady request rate
+# spread over more and more connections
+def bench_service(bursts=(100, 1000, 4000), connections=(10, 100, 1000), rate=2000, duration=2):
+    async def measure(count, connection_count, rate):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "machines.sock")
+            service = MachineService()
+            server = await asyncio.start_unix_server(service.serve_connection, path, backlog=4096)
+            async with server:
+                start = time.perf_counter()
+                _, latencies = await generate_load(path, service_requests(count), connection_count, rate)
+                elapsed = time.perf_counter() - start
+            service.close()
+        ordered = sorted(latencies.values())
+        return ordered[len(ordered) // 2], ordered[int(len(ordered) * 0.99)], count / elapsed
+
+    print(f"{'load':>24} {'p50 ms':>8} {'p99 ms':>8} {'requests/s':>11}")
+    for count in bursts:
+        p50, p99, throughput = asyncio.run(measure(count, max(1, count // 100), None))
+        print(f"{f'burst of {count}':>24} {p50 * 1e3:>8.1f} {p99 * 1e3:>8.1f} {throughput:>11.0f}")
+    for connection_count in connections:
+        p50, p99, throughput = asyncio.run(measure(rate * duration, connection_count, rate))
+        print(f"{f'{rate}/s on {connection_count} conns':>24} {p50 * 1e3:>8.1f} {p99 * 1e3:>8.1f} {throughput:>11.0f}")
+
+def retained_bytes(build, count):
+    """
+        Bytes per object still allocated after build(index) has made count objects, traced with tracemalloc (caches
+        that the objects share are filled during the trace, so their cost is spread over the objects).
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        objects = [build(index) for index in range(count)]
+        gc.collect()
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return allocated / count, objects
+
+def machine_memory(count=1000, seed=0):
+    """
+        {kind: (bytes per machine, transitions per machine)} for count loaded machines of each kind: regex DFAs as
+        DFA objects and as their compact tables, text-table Turing machines (compiled) and PDAs.
+    """
+    rng = random.Random(seed)
+    letters = "abcdefgh"
+    regexes = [f"({'|'.join(rng.sample(letters, 3))})*" + ''.join(rng.choice(letters) for _ in range(4)) for _ in range(count)]
+    texts = [random_machine_text(rng) for _ in range(count)]
+    dfa_transitions = sum(len(regex_to_dfa(regex).transitions) for regex in regexes) / count
+    memory = {}
+    memory['dfa'] = retained_bytes(lambda index: regex_to_dfa(regexes[index]), count)[0], dfa_transitions
+    memory['dfa_compact'] = retained_bytes(lambda index: regex_to_dfa(regexes[index]).compact(), count)[0], dfa_transitions
+
+    def load_tm(index):
+        machine = TuringMachine(parse_machine(texts[index]))
+        machine.compile()
+        return machine
+
+    size, machines = retained_bytes(load_tm, count)
+    memory['tm'] = size, sum(len(machine.transitions) for machine in machines) / count
+    size, machines = retained_bytes(lambda index: PDA(), count)
+    memory['pda'] = size, sum(len(machine.transitions) for machine in machines) / count
+    return memory
+
+# Memory: tracemalloc bytes per loaded machine and per transition
+def bench_memory(count=1000):
+    print(f"{'machine':>12} {'bytes/machine':>14} {'transitions':>12} {'bytes/transition':>17}")
+    for kind, (size, transitions) in machine_memory(count).items():
+        print(f"{kind:>12} {size:>14.0f} {transitions:>12.1f} {size / transitions:>17.1f}")
+
+# Suite: seeded workloads over the compile and simulate hot paths, as JSON-ready metrics that can be compared
+# against a stored baseline (python bench_machines.py suite --json results.json --baseline bench_baseline.json)
+def best_time(run, repeat=5, sample=0.05):
+    """
+        Best time per call over repeat samples (the minimum is the least noisy estimate of the cost). Fast workloads
+        are called in a loop so that every sample lasts at least sample seconds.
+    """
+    start = time.perf_counter()
+    run()
+    loops = max(1, int(sample / max(time.perf_counter() - start, 1e-9)))
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        timings.append((time.perf_counter() - start) / loops)
+    return min(timings)
+
+def metric(value, unit, better):
+    return {'value': value, 'unit': unit, 'better': better}
+
+def run_suite(repeat=5):
+    """
+        Runs every workload and returns {metric name: {'value', 'unit', 'better': 'higher' or 'lower'}}.
+    """
+    results = {}
+    # Problem 1: regex compile time against pattern size
+    for operators in (100, 1000, 3000):  # Determinizing these patterns grows faster than linearly
+        regex = make_regex(operators)
+        results[f"regex_to_dfa/operators={operators}"] = metric(best_time(lambda: regex_to_dfa(regex), repeat), 's', 'lower')
+    for k in (8, 12):
+        nfa = build_nfa("(a|b)*a" + "(a|b)" * k)
+        results[f"nfa_to_dfa/states={2 ** (k + 1) + 1}"] = metric(best_time(lambda: nfa_to_dfa(nfa), repeat), 's', 'lower')
+    # Problem 1: minimization time against chain length
+    for n in (4000, 16000):
+        chain = regex_to_dfa("a" * n)
+        results[f"minimize_chain/states={n + 1}"] = metric(best_time(chain.minimize, repeat), 's', 'lower')
+    # Problem 1: DFA throughput against input length (the same number of bytes at every length)
+    dfa = regex_to_dfa("(a|b)*abb")
+    for length in (16, 1024, 65536):
+        strings = random_strings(max(1, 2 ** 18 // length), length)
+        seconds = best_time(lambda: [dfa.simulate(string) for string in strings], repeat)
+        results[f"dfa_simulate/length={length}"] = metric(len(strings) * length / seconds, 'bytes/s', 'higher')
+        seconds = best_time(lambda: dfa.simulate_many(strings), repeat)
+        results[f"dfa_simulate_many/length={length}"] = metric(len(strings) * length / seconds, 'bytes/s', 'higher')
+    # Problem 2: PDA throughput on long odd palindromes (fast path), and the stack simulation on shorter ones
+    rng = random.Random(0)
+    for length, fast in ((10 ** 6 + 1, True), (201, False), (801, False)):
+        half = ''.join(rng.choice("ab") for _ in range(length // 2))
+        string = half + "a" + half[::-1]
+        pda = PDA(fast=fast)
+        seconds = best_time(lambda: pda.simulate(string), repeat)
+        results[f"pda_{'fast' if fast else 'stack'}/length={length}"] = metric(length / seconds, 'bytes/s', 'higher')
+    # Problem 3: TM step rate and wall time against n on 0^n 1^n 0^n 1^n
+    compiled = TuringMachine().compile()
+    for n, macro in ((30, False), (300, False), (30, True), (300, True), (3000, True)):
+        string = "0" * n + "1" * n + "0" * n + "1" * n
+        result = compiled.run(string, macro=macro)
+        seconds = best_time(lambda: compiled.run(string, macro=macro), repeat)
+        name = f"tm_{'macro' if macro else 'step'}/n={n}"
+        results[name + "/seconds"] = metric(seconds, 's', 'lower')
+        results[name + "/step_rate"] = metric(result.steps / seconds, 'steps/s', 'higher')
+    # Memory held per transition by loaded machines
+    for kind, (size, transitions) in machine_memory(300).items():
+        results[f"memory/{kind}/bytes_per_transition"] = metric(size / transitions, 'B', 'lower')
+    return results
+
+def compare(results, baseline, tolerance):
+    """
+        Report lines for every metric in results, the names of those that got worse than baseline by more than
+        tolerance (a fraction: 0.2 allows 20% slower), and the names of those baseline does not have (a baseline
+        recorded before they were added, which cannot catch their regressions until it is recorded again).
+    """
+    lines = []
+    regressions = []
+    missing = []
+    for name, current in results.items():
+        if name not in baseline:
+            missing.append(name)
+            lines.append(f"{name:>40} {'-':>14} {current['value']:>14.4g} {current['unit']:>8} {'-':>7}  NOT IN BASELINE")
+            continue
+        before = baseline[name]['value']
+        ratio = current['value'] / before if current['better'] == 'higher' else before / current['value']  # > 1 is faster
+        flag = ""
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        lines.append(f"{name:>40} {before:>14.4g} {current['value']:>14.4g} {current['unit']:>8} {ratio:>6.2f}x{flag}")
+    return lines, regressions, missing
+
+def suite(options):
+    results = run_suite(options.repeat)
+    document = {'meta': {'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count()},
+                'results': results}
+    for path in (options.json, options.save_baseline):
+        if path:
+            with open(path, 'w') as file:
+                json.dump(document, file, indent=2, sort_keys=True)
+    if not options.baseline:
+        for name, current in results.items():
+            print(f"{name:>40} {current['value']:>14.4g} {current['unit']:>8}")
+        return 0
+    with open(options.baseline) as file:
+        stored = json.load(file)
+    if stored['meta'] != document['meta']:
+        print(f"Note: the baseline was recorded on {stored['meta']}, this run is on {document['meta']}")
+    lines, regressions, missing = compare(results, stored['results'], options.tolerance)
+    print(f"{'metric':>40} {'baseline':>14} {'current':>14} {'unit':>8} {'speed':>7}")
+    print('\n'.join(lines))
+    if missing:
+        print(f"{len(missing)} metric(s) missing from the baseline (record it again with --save-baseline): {', '.join(missing)}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {options.tolerance:.0%}: {', '.join(regressions)}")
+    return 1 if regressions or missing else 0
+
+def tables():
+    bench_build_nfa()
+    bench_nfa_to_dfa()
+    bench_alphabet_classes()
+    bench_minimize()
+    bench_minimize_scaling()
+    bench_simulate_many()
+    bench_lazy_dfa()
+    bench_regex_set()
+    bench_dfa_cache()
+    bench_product()
+    bench_pda_fast_path()
+    bench_cfg()
+    bench_tm_compiled()
+    bench_tm_loader()
+    bench_memory()
+    bench_batch_runner()
+    bench_service()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks: printed tables (default) or the JSON suite.")
+    parser.add_argument('mode', nargs='?', choices=('tables', 'suite'), default='tables')
+    parser.add_argument('--json', help="write the suite results to this file")
+    parser.add_argument('--baseline', help="compare against this stored results file; exit 1 on a regression")
+    parser.add_argument('--save-baseline', help="also write the results to this file as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.3, help="allowed slowdown before a regression (fraction)")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per workload (the best is kept)")
+    options = parser.parse_args()
+    if options.mode == 'tables':
+        tables()
+    else:
+        raise SystemExit(suite(options))
@@ -0,0 +1,114 @@
+import argparse
+import sys
+from collections import deque
+from multiprocessing import Pool, cpu_count
+import problems  # Registers the "Problem N" directories as the packages Problem_N
+from Problem_1.regex_to_dfa_v2 import regex_to_dfa  # Problem 1
+from Problem_2.pda_odd_palindrome import PDA  # Problem 2
+from Problem_3.TM import TuringMachine, load_machine  # Problem 3
+
+# Usage:
+#   python run_machines.py dfa --regex "(a|b)*abb" inputs.txt
+#   python run_machines.py pda < inputs.txt
+#   python run_machines.py tm --machine "Problem 3/machines/0n1n0n1n.tm" --max-steps 1000000 -w 8 inputs.txt
+# Prints one verdict (ACCEPT, REJECT or UNKNOWN) per input line, in input order; the TM also prints the reason and step count.
+
+def build_machine(options):
+    """
+        The machine described by the command-line options.
+    """
+    if options.kind == 'dfa':
+        return regex_to_dfa(options.regex, minimize=options.minimize)
+    if options.kind == 'pda':
+        return PDA()
+    return load_machine(options.machine) if options.machine else TuringMachine()
+
+def run_chunk(machine, options, chunk):
+    """
+        The output lines for one chunk of inputs.
+    """
+    if options.kind == 'tm':
+        results = (machine.run(string, max_steps=options.max_steps, timeout=options.timeout) for string in chunk)
+        return [f"{result.verdict}\t{result.reason}\t{result.steps}" for result in results]
+    return ["ACCEPT" if accepted else "REJECT" for accepted in machine.simulate_many(chunk)]
+
+# Each pool worker builds the machine once, in its initializer
+worker_machine = None
+worker_options = None
+
+def start_worker(options):
+    global worker_machine, worker_options
+    worker_machine = build_machine(options)
+    worker_options = options
+
+def run_worker_chunk(chunk):
+    return '\n'.join(run_chunk(worker_machine, worker_options, chunk)) + '\n'
+
+def read_lines(paths):
+    """
+        Streams input lines (without their line endings) from the files in paths, or stdin for none or '-'.
+    """
+    for path in paths or ['-']:
+        file = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        try:
+            for line in file:
+                yield line.rstrip('\r\n')
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
+def chunks_of(lines, size):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def ordered_map(pool, function, chunks, window):
+    """
+        Like pool.imap, but with at most window chunks dispatched and not yet yielded, so a huge input is streamed
+        instead of being read into memory ahead of the workers.
+    """
+    pending = deque()
+    for chunk in chunks:
+        pending.append(pool.apply_async(function, (chunk,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(description="Run a DFA, PDA or Turing machine over newline-delimited inputs.")
+    parser.add_argument('kind', choices=('dfa', 'pda', 'tm'), help="machine to run")
+    parser.add_argument('inputs', nargs='*', help="input files (default: stdin)")
+    parser.add_argument('--regex', help="regular expression compiled to the DFA (dfa)")
+    parser.add_argument('--minimize', action='store_true', help="minimize the DFA (dfa)")
+    parser.add_argument('--machine', help="Turing machine table file, JSON or text (tm; default: the built-in machine)")
+    parser.add_argument('--max-steps', type=int, help="step budget per input (tm)")
+    parser.add_argument('--timeout', type=float, help="time budget in seconds per input (tm)")
+    parser.add_argument('-w', '--workers', type=int, default=cpu_count(), help="worker processes (1 runs in this process)")
+    parser.add_argument('-c', '--chunk-size', type=int, default=1024, help="inputs per dispatched chunk")
+    options = parser.parse_intermixed_args(argv)
+    if options.kind == 'dfa' and options.regex is None:
+        parser.error("dfa needs --regex")
+    return options
+
+def main(argv=None, output=None):
+    options = parse_arguments(argv)
+    output = output or sys.stdout
+    chunks = chunks_of(read_lines(options.inputs), options.chunk_size)
+    if options.workers <= 1:
+        machine = build_machine(options)
+        for chunk in chunks:
+            output.write('\n'.join(run_chunk(machine, options, chunk)) + '\n')
+        return 0
+    with Pool(options.workers, initializer=start_worker, initargs=(options,)) as pool:
+        for lines in ordered_map(pool, run_worker_chunk, chunks, window=4 * options.workers):
+            output.write(lines)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
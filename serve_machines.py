@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import problems  # Registers the "Problem N" directories as the packages Problem_N
+from Problem_1.regex_to_dfa_v2 import LazyDFA, build_nfa, nfa_to_dfa  # Problem 1
+from Problem_2.pda_odd_palindrome import PDA  # Problem 2
+from Problem_3.TM import ACCEPT, REJECT, UNKNOWN, TuringMachine, machine_from_text  # Problem 3
+
+# JSON-lines protocol, one object per line each way (responses can come back out of order, matched by "id"):
+#   {"id": 1, "machine": "dfa", "regex": "(a|b)*abb", "input": "aabb"}   -> {"id": 1, "verdict": "ACCEPT"}
+#   {"id": 2, "machine": "pda", "input": "ababa"}                        -> {"id": 2, "verdict": "ACCEPT"}
+#   {"id": 3, "machine": "tm", "input": "0101", "max_steps": 1000}      -> {"id": 3, "verdict": "ACCEPT", "reason": "accept state", "steps": 18}
+# "tm" runs the built-in machine, or the one in "table" (JSON or the text table format of Problem 3).
+# A request that cannot be evaluated (malformed, or failing in its machine) gets {"id": ..., "error": "..."}.
+#
+# Usage:
+#   python serve_machines.py                        # stdin/stdout
+#   python serve_machines.py --socket /tmp/machines.sock
+#   python serve_machines.py --port 8765
+
+def run_tm_job(table, input_string, max_steps, timeout):
+    """
+        A long TM run, in a pool process (machine_from_text caches the compiled machine per process).
+    """
+    machine = machine_from_text(table) if table is not None else TuringMachine()
+    result = machine.run(input_string, max_steps=max_steps, timeout=timeout)
+    return result.verdict, result.reason, result.steps
+
+class MachineService:
+    def __init__(self, batch_size=256, batch_delay=0.002, max_pending=10000, max_steps=10 ** 7, inline_steps=20000,
+                 tm_timeout=None, tm_processes=None, machine_cache_size=256, nfa_states=100000, dfa_states=10000):
+        """
+            Evaluates requests (dicts in the JSON-lines protocol) on cached machines.
+            DFA and PDA requests are micro-batched per machine: a batch is run with simulate_many when batch_size
+            requests are waiting or batch_delay seconds after its first request. TM requests run in the event loop for
+            up to inline_steps steps; a run that needs more is restarted in a process pool, so long runs never block
+            the loop. Every request is limited to max_steps steps (its own "max_steps" can only lower that; for DFAs
+            and PDAs a step is an input character) and at most max_pending requests are in flight per connection.
+            Machines are compiled in the event loop, so compilation is bounded: a regex needing more than nfa_states
+            NFA states is an error, and one whose DFA needs more than dfa_states states runs as a LazyDFA.
+        """
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_pending = max_pending
+        self.max_steps = max_steps
+        self.inline_steps = inline_steps
+        self.tm_timeout = tm_timeout
+        self.tm_processes = tm_processes
+        self.machine_cache_size = machine_cache_size
+        self.nfa_states = nfa_states
+        self.dfa_states = dfa_states
+        self.machines = {}  # Machine key -> machine or its compile error, oldest first (dropped when full)
+        self.batches = {}  # Machine key -> (machine, [(input, future)] waiting to be run)
+        self.timers = {}  # Machine key -> timer that flushes its batch
+        self.pool = None
+        self.offloaded = 0  # TM runs sent to the process pool
+
+    def machine(self, key):
+        """
+            The cached machine for key. A regex or table that fails to compile is cached as its error message, so
+            asking for it again raises ValueError at once instead of compiling it again.
+        """
+        machine = self.machines.get(key)
+        if machine is None:
+            kind, text = key
+            try:
+                if kind == 'dfa':
+                    nfa = build_nfa(text, max_states=self.nfa_states)
+                    try:
+                        machine = nfa_to_dfa(nfa, max_states=self.dfa_states).compact()  # Only the table is kept
+                    except ValueError:
+                        machine = LazyDFA(nfa)  # Subset construction blows up: build only the states inputs reach
+                elif kind == 'pda':
+                    machine = PDA()
+                else:
+                    machine = machine_from_text(text) if text is not None else TuringMachine()
+            except Exception as error:
+                machine = str(error) or type(error).__name__
+            if len(self.machines) >= self.machine_cache_size:
+                del self.machines[next(iter(self.machines))]
+            self.machines[key] = machine
+        if isinstance(machine, str):
+            raise ValueError(machine)
+        return machine
+
+    async def evaluate(self, request):
+        """
+            The response to one request. Whatever goes wrong while evaluating it (a malformed request, a regex or
+            table the machines reject, an input a machine cannot run) becomes its {"id": ..., "error": ...} response,
+            so one bad request never takes down the other requests on its connection.
+        """
+        response = {'id': request.get('id')} if isinstance(request, dict) else {'id': None}
+        try:
+            response.update(await self.run_request(request))
+        except Exception as error:
+            response['error'] = str(error) or type(error).__name__
+        return response
+
+    async def run_request(self, request):
+        """
+            The verdict fields of the response to one request; raises on a request that cannot be evaluated.
+        """
+        if not isinstance(request, dict) or not isinstance(request.get('input'), str):
+            raise ValueError("a request is an object with a string 'input'")
+        kind = request.get('machine')
+        if kind == 'dfa':
+            if not isinstance(request.get('regex'), str):
+                raise ValueError("a dfa request needs a string 'regex'")
+            key = ('dfa', request['regex'])
+        elif kind == 'pda':
+            key = ('pda', None)
+        elif kind == 'tm':
+            if not isinstance(request.get('table'), (str, type(None))):
+                raise ValueError("a tm request's 'table' must be a string")
+            key = ('tm', request.get('table'))
+        else:
+            raise ValueError("'machine' must be 'dfa', 'pda' or 'tm'")
+        max_steps = min(int(request.get('max_steps', self.max_steps)), self.max_steps)
+        machine = self.machine(key)
+
+        input_string = request['input']
+        if kind == 'tm':
+            result = machine.run(input_string, max_steps=min(max_steps, self.inline_steps), timeout=self.tm_timeout)
+            if result.verdict == UNKNOWN and result.reason == 'step budget' and max_steps > self.inline_steps:
+                # Too long to run in the event loop: start over in the process pool with the full budget
+                if self.pool is None:
+                    self.pool = ProcessPoolExecutor(max_workers=self.tm_processes)
+                self.offloaded += 1
+                verdict, reason, steps = await asyncio.get_running_loop().run_in_executor(
+                    self.pool, run_tm_job, key[1], input_string, max_steps, self.tm_timeout)
+            else:
+                verdict, reason, steps = result.verdict, result.reason, result.steps
+            return {'verdict': verdict, 'reason': reason, 'steps': steps}
+        if len(input_string) > max_steps:
+            return {'verdict': UNKNOWN}
+        future = asyncio.get_running_loop().create_future()
+        _, batch = self.batches.setdefault(key, (machine, []))
+        batch.append((input_string, future))
+        if len(batch) >= self.batch_size:
+            self.flush(key)
+        elif len(batch) == 1:
+            self.timers[key] = asyncio.get_running_loop().call_later(self.batch_delay, self.flush, key)
+        return {'verdict': ACCEPT if await future else REJECT}
+
+    def flush(self, key):
+        """
+            Runs the waiting batch of one machine through simulate_many. If the batch fails, its inputs are run one
+            by one with simulate, so only the inputs that fail on their own get an error.
+        """
+        timer = self.timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        machine, batch = self.batches.pop(key, (None, []))
+        if not batch:
+            return
+        try:
+            results = list(machine.simulate_many([input_string for input_string, _ in batch]))
+        except Exception:
+            results = None
+        for index, (input_string, future) in enumerate(batch):
+            if future.done():
+                continue  # The request was cancelled
+            if results is not None:
+                future.set_result(bool(results[index]))
+                continue
+            try:
+                future.set_result(bool(machine.simulate(input_string)))
+            except Exception as error:
+                future.set_exception(error)
+
+    async def handle(self, reader, write):
+        """
+            Serves one stream of request lines; write(line) sends a response line. Reading pauses while
+            max_pending requests are in flight, which pushes back on the client.
+        """
+        pending = asyncio.Semaphore(self.max_pending)
+        tasks = set()
+
+        async def respond(line):
+            try:
+                try:
+                    request = json.loads(line)
+                except ValueError as error:
+                    response = {'id': None, 'error': f"invalid JSON: {error}"}
+                else:
+                    response = await self.evaluate(request)
+                await write(json.dumps(response) + '\n')
+            finally:
+                pending.release()
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            await pending.acquire()
+            task = asyncio.create_task(respond(line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def serve_connection(self, reader, writer):
+        async def write(line):
+            writer.write(line.encode())
+            await writer.drain()
+
+        try:
+            await self.handle(reader, write)
+        finally:
+            writer.close()
+
+    async def serve_stdio(self):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=2 ** 24)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+        async def write(line):
+            sys.stdout.write(line)
+            sys.stdout.flush()
+
+        await self.handle(reader, write)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve DFA, PDA and Turing machine evaluation over JSON lines.")
+    parser.add_argument('--socket', help="listen on this Unix socket path")
+    parser.add_argument('--host', default='127.0.0.1', help="TCP host (with --port)")
+    parser.add_argument('--port', type=int, help="listen on this TCP port")
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--batch-delay', type=float, default=0.002, help="seconds a batch waits for more requests")
+    parser.add_argument('--max-pending', type=int, default=10000, help="requests in flight per connection")
+    parser.add_argument('--max-steps', type=int, default=10 ** 7, help="step budget per request")
+    parser.add_argument('--tm-timeout', type=float, help="time budget in seconds per TM request")
+    options = parser.parse_args(argv)
+    service = MachineService(batch_size=options.batch_size, batch_delay=options.batch_delay, max_pending=options.max_pending,
+                             max_steps=options.max_steps, tm_timeout=options.tm_timeout)
+    try:
+        if options.socket or options.port:
+            if options.socket:
+                server = await asyncio.start_unix_server(service.serve_connection, options.socket, limit=2 ** 24, backlog=4096)
+            else:
+                server = await asyncio.start_server(service.serve_connection, options.host, options.port, limit=2 ** 24, backlog=4096)
+            async with server:
+                await server.serve_forever()
+        else:
+            await service.serve_stdio()
+    finally:
+        service.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,7 +1,20 @@
+import asyncio
+import io
+import itertools
+import json
+import mmap
+import os
+import random
+import tempfile
 import unittest
-from Problem_1.regex_to_dfa_v2 import DFA, regex_to_dfa  # Problem 1
-from Problem_2.pda_odd_palindrome import PDA  # Problem 2
-from Problem_3.TM import TuringMachine  # Problem 3
+import problems  # Registers the "Problem N" directories as the packages Problem_N
+from Problem_1 import regex_to_dfa as hand_written  # Problem 1 (hardcoded DFA)
+from Problem_1.regex_to_dfa_v2 import DFA, DFACache, DFATable, LazyDFA, build_nfa, compile_many, nfa_to_dfa, regex_set_to_dfa, regex_to_dfa  # Problem 1
+from Problem_2.pda_odd_palindrome import CFG, PDA  # Problem 2
+from Problem_3.TM import ACCEPT, REJECT, UNKNOWN, TMResult, TuringMachine, load_machine, machine_from_text, parse_machine  # Problem 3
+import run_machines  # Batch runner
+from bench_machines import compare, generate_load, machine_memory, random_machine_text, service_requests  # Benchmarks
+from serve_machines import MachineService  # Service
 
 class TestComputationalTheory(unittest.TestCase):
     # Problem 1: DFA for (a|b)*abb
@@ -22,6 +35,211 @@ class TestComputationalTheory(unittest.TestCase):
         # self.assertFalse(dfa.simulate("abba"), "Should reject 'abba'")
         # self.assertFalse(dfa.simulate("abc"), "Should reject 'abc' (invalid symbol)")
 
+    # Problem 1: Thompson construction on long generated patterns
+    def test_build_nfa_large_pattern(self):
+        nfa = build_nfa("(a|b)*a" * 5000)
+        
+        # 2 states per symbol, union and star
+        self.assertEqual(len(nfa.states), 50000)
+        self.assertEqual(len(nfa.accepts), 1)
+        self.assertTrue(nfa_to_dfa(build_nfa("(a|b)*a" * 3)).simulate("abaa"), "Should accept 'abaa'")
+        self.assertFalse(nfa_to_dfa(build_nfa("(a|b)*a" * 3)).simulate("aba"), "Should reject 'aba'")
+
+    # Problem 1: Hopcroft minimization gives the hand-written 4-state DFA for (a|b)*abb
+    def test_dfa_minimize(self):
+        dfa = regex_to_dfa("(a|b)*abb", minimize=True)
+        expected = hand_written.regex_to_dfa("(a|b)*abb")
+        
+        self.assertEqual(len(regex_to_dfa("(a|b)*abb").states), 5)
+        self.assertEqual(dfa.states, expected.states)
+        # Symbols are codepoint ranges; each one covers a single character here
+        self.assertEqual({(state, chr(dfa.ranges[symbol][0][0])): next_state for (state, symbol), next_state in dfa.transitions.items()},
+                         expected.transitions)
+        self.assertEqual(dfa.accepts, expected.accepts)
+        self.assertEqual(len(regex_to_dfa("((a|b)(a|b))*", minimize=True).states), 2)
+
+    # Problem 1: dense table and batched simulation agree with DFA.simulate
+    def test_dfa_simulate_many(self):
+        dfa = regex_to_dfa("(a|b)*abb")
+        strings = ["abb", "aabb", "", "a", "ab", "abba", "abc", "babb", "abababb", "bbbbbbbbbbbbbbbbabb"]
+        
+        table = dfa.compile()
+        self.assertEqual(len(table.table), (len(dfa.states) + 1) * table.width)
+        self.assertEqual([table.run(string) for string in strings], [dfa.simulate(string) for string in strings])
+        self.assertEqual(list(dfa.simulate_many(strings)), [dfa.simulate(string) for string in strings])
+        # Mixed lengths (one far longer than the rest) and lone surrogates give the same verdicts as simulate()
+        rng = random.Random(3)
+        mixed = regex_to_dfa("(a|b)*abb|.")
+        strings = ["ab" * 200000 + "abb", "\ud800", "\U0001f600", ""] + [''.join(rng.choice("ab") for _ in range(rng.randrange(300))) for _ in range(2000)]
+        self.assertEqual([bool(accepted) for accepted in mixed.simulate_many(strings)], [mixed.simulate(string) for string in strings])
+
+    # Problem 1: lazy DFA matches the eager DFA and keeps its cache bounded
+    def test_lazy_dfa(self):
+        regex = "(a|b)*a(a|b)(a|b)(a|b)(a|b)(a|b)"
+        dfa = regex_to_dfa(regex)
+        lazy = LazyDFA(build_nfa(regex), cache_size=8)
+        strings = ["", "a", "abbbbb", "babbbbb", "aaaaaa", "bbbbbb", "ababababab", "abcbbb"] + ["ab" * n + "b" * n for n in range(12)]
+        
+        self.assertEqual([lazy.simulate(string) for string in strings], [dfa.simulate(string) for string in strings])
+        self.assertLessEqual(len(lazy.cache), 8)
+        self.assertGreater(lazy.evictions, 0)
+        # Unicode input: edges are per alphabet class, not per character, and only cached subsets are kept
+        regex = ".*a[^b]{4}"
+        dfa, lazy = regex_to_dfa(regex), LazyDFA(build_nfa(regex), cache_size=8)
+        text = ''.join(chr(0x4e00 + index) + "ab"[index % 2] for index in range(3000))
+        self.assertEqual([lazy.simulate(text[:end]) for end in range(0, 6000, 7)], [dfa.simulate(text[:end]) for end in range(0, 6000, 7)])
+        self.assertTrue(all(len(transitions) <= len(lazy.symbol_map.ranges) for _, _, transitions in lazy.cache.values()))
+        self.assertEqual(len(lazy.ids), len(lazy.cache))
+
+    # Problem 1: streaming matcher gives the same verdict for every way of chunking the input
+    def test_dfa_matcher_chunks(self):
+        dfa = regex_to_dfa("(a|b)*abb")
+        
+        for string in ["abb", "aabb", "abab", "", "abcabb", "aababb"]:
+            for split in range(len(string) + 1):
+                self.assertEqual(dfa.matcher().feed(string[:split]).feed(string[split:]).result(), dfa.simulate(string))
+                chunks = (string[:split].encode(), memoryview(string[split:].encode()))
+                self.assertEqual(dfa.matcher().feed(chunks[0]).feed(chunks[1]).result(), dfa.simulate(string))
+        
+        # Bytes are read as UTF-8, including characters split between chunks; invalid UTF-8 is rejected
+        unicode = regex_to_dfa("(\u00e9|\u4e00|a)+.x")
+        for string in ["\u00e9\u4e00\U0001f600x", "a\u00e9x", "\u00e9\u00e9", "ax", "\u00e9\u00fex", "\u00e0\u00e9x"]:
+            data = string.encode()
+            for split in range(len(data) + 1):
+                self.assertEqual(unicode.matcher().feed(data[:split]).feed(data[split:]).result(), unicode.simulate(string))
+        self.assertTrue(regex_to_dfa("\u00e9").matcher().feed("\u00e9".encode()).result())
+        for invalid in (b"a\xe9x", b"a\xc3", b"a\xc0\xa9x", b"a\xed\xa0\x80x"):  # Latin-1, cut off, overlong, surrogate
+            self.assertFalse(unicode.matcher().feed(invalid).result())
+        
+        data = b"ab" * 100000 + b"abb"
+        self.assertTrue(dfa.matcher().feed_file(io.BytesIO(data), chunk_size=4096).result())
+        with tempfile.TemporaryFile() as file:
+            file.write(data)
+            file.flush()
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                self.assertTrue(dfa.matcher().feed(mapped).result())
+
+    # Problem 1: finditer returns leftmost-longest non-overlapping spans
+    def test_dfa_finditer(self):
+        self.assertEqual(list(regex_to_dfa("abb").finditer("xxabbabbcabb")), [(2, 5), (5, 8), (9, 12)])
+        self.assertEqual(list(regex_to_dfa("(a|b)*abb").finditer("babbabbcab")), [(0, 7)])
+        self.assertEqual(list(regex_to_dfa("ab|a").finditer("aab")), [(0, 1), (1, 3)])
+        self.assertEqual(list(regex_to_dfa("a*").finditer("aab")), [(0, 2), (2, 2), (3, 3)])
+        self.assertEqual(list(regex_to_dfa("abb").finditer("")), [])
+        # The reversed DFA of [ab]{20}a[ab]* has 2^21 states; only the subsets the text reaches are built
+        dfa = regex_to_dfa("[ab]{20}a[ab]*")
+        rng = random.Random(6)
+        text = ''.join(rng.choice("abbbbc") for _ in range(3000))
+        expected = []
+        position = 0
+        while position <= len(text):
+            ends = [end for end in range(position, min(len(text), position + 200) + 1) if dfa.simulate(text[position:end])]
+            if ends:
+                expected.append((position, ends[-1]))
+                position = ends[-1] if ends[-1] > position else ends[-1] + 1
+            else:
+                position += 1
+        self.assertEqual(list(dfa.finditer(text)), expected)
+        self.assertLessEqual(len(dfa.reverse.cache), dfa.reverse.cache_size)
+        # Every forward run of ab|a[a-z]*c scans on looking for a c; runs that meet an earlier run's (position, state)
+        # stop there, so this takes linear time, and a late c still extends the first match to it
+        dfa = regex_to_dfa("ab|a[a-z]*c")
+        self.assertEqual(list(dfa.finditer("ab" * 50000)), [(i, i + 2) for i in range(0, 100000, 2)])
+        self.assertEqual(list(dfa.finditer("ab" * 1000 + "c" + "ab")), [(0, 2001), (2001, 2003)])
+        self.assertEqual(list(dfa.finditer("-ab" * 3 + "ac")), [(1, 3), (4, 6), (7, 11)])
+
+    # Problem 1: one DFA for a set of patterns reports every matching pattern ID
+    def test_regex_set_to_dfa(self):
+        patterns = ["(a|b)*abb", "a*", "(ab|ba)*", "b(a|b)*"]
+        dfa = regex_set_to_dfa(patterns)
+        singles = [regex_to_dfa(regex) for regex in patterns]
+        
+        for string in ["", "a", "abb", "babb", "abab", "aaaa", "ba", "abc"]:
+            expected = frozenset(index for index, single in enumerate(singles) if single.simulate(string))
+            self.assertEqual(dfa.matches(string), expected, string)
+            self.assertEqual(dfa.minimize().matches(string), expected, string)
+
+    # Problem 1: concurrent compilation gives exactly the serial result
+    def test_compile_many_concurrent(self):
+        rng = random.Random(0)
+        pieces = ["a", "b", "(a|b)", "(ab|ba)", "a*", "(a|b)*", "(aa|b)*"]
+        patterns = ["".join(rng.choice(pieces) for _ in range(rng.randint(1, 6))) for _ in range(2000)]
+        
+        serial = [regex_to_dfa(regex) for regex in patterns]
+        for dfas in (compile_many(patterns, workers=16), compile_many(patterns[:200], workers=2, processes=True)):
+            for dfa, expected in zip(dfas, serial):
+                self.assertEqual((dfa.states, dfa.transitions, dfa.start, dfa.accepts),
+                                 (expected.states, expected.transitions, expected.start, expected.accepts))
+
+    # Problem 1: DFAs round-trip through the on-disk cache
+    def test_dfa_cache(self):
+        strings = ["", "a", "abb", "aabb", "abab", "abc"]
+        with tempfile.TemporaryDirectory() as directory:
+            cache = DFACache(directory, size=1)
+            compiled = cache.get("(a|b)*abb")
+            self.assertIs(cache.get("(a|b)*abb"), compiled)
+            cache.get("a*")  # Evicts (a|b)*abb from memory
+            self.assertEqual(list(cache.entries), ["a*"])
+            
+            loaded = DFACache(directory).get("(a|b)*abb")
+            self.assertIsInstance(loaded, DFATable)
+            self.assertIsInstance(loaded.table, memoryview)  # Read from the mapping, not copied into a dict
+            self.assertEqual([loaded.simulate(string) for string in strings], [compiled.simulate(string) for string in strings])
+            self.assertEqual(list(loaded.simulate_many(strings)), [compiled.simulate(string) for string in strings])
+            self.assertTrue(DFACache(directory).get("a*").simulate(""))
+
+    # Problem 1: bitset subset construction on a pattern with 2^14 + 1 DFA states
+    def test_nfa_to_dfa_large(self):
+        dfa = nfa_to_dfa(build_nfa("(a|b)*a" + "(a|b)" * 13))
+        
+        self.assertEqual(len(dfa.states), 16385)
+        self.assertTrue(dfa.simulate("b" + "a" + "b" * 13))
+        self.assertFalse(dfa.simulate("a" + "b" * 14))
+
+    # Problem 1: full regex syntax (classes, ranges, ., +, ?, {m,n}, escapes) over arbitrary characters
+    def test_regex_syntax(self):
+        identifier = regex_to_dfa("[a-zA-Z_][a-zA-Z0-9_]*")
+        self.assertTrue(identifier.simulate("snake_case_1"))
+        self.assertFalse(identifier.simulate("1abc"))
+        self.assertFalse(identifier.simulate("héllo"))
+        
+        number = regex_to_dfa("-?\\d+(\\.\\d{1,3})?")
+        self.assertTrue(number.simulate("-12.5"))
+        self.assertTrue(number.simulate("7"))
+        self.assertFalse(number.simulate("7."))
+        self.assertFalse(number.simulate("1.2345"))
+        
+        self.assertTrue(regex_to_dfa("[^\\n]+é\\u00e9").simulate("日本éé"))
+        self.assertTrue(regex_to_dfa("a{2,}b?").simulate("aaaa"))
+        self.assertFalse(regex_to_dfa("a{2,}b?").simulate("ab"))
+        self.assertTrue(regex_to_dfa("(|a)\\*.").simulate("*\u2603"))
+        self.assertTrue(regex_to_dfa("[]-]{2}").simulate("]-"))
+        
+        # A class is one edge and a handful of disjoint ranges, not one edge per character
+        nfa = build_nfa("[\\u0000-\\uffff]")
+        self.assertEqual(len(nfa.transitions), 1)
+        self.assertEqual(regex_to_dfa("[^a]").ranges, [((0, 96), (98, 0x10FFFF))])
+        
+        for bad in ["(", "a)", "*a", "[a", "a{3,1}", "\\q", "^a"]:
+            with self.assertRaises(ValueError):
+                regex_to_dfa(bad)
+        
+        # Pathological nesting and counts fail cleanly instead of hitting the recursion limit or exhausting memory
+        self.assertTrue(regex_to_dfa("a" + "*" * 2000).simulate("aaa"))
+        self.assertTrue(regex_to_dfa("(" * 100 + "a" + ")" * 100).simulate("a"))
+        for bad in ["(" * 300 + "a" + ")" * 300, "a{100000000}", "a{2,100000000}"]:
+            with self.assertRaises(ValueError):
+                regex_to_dfa(bad)
+
+    # Problem 1: symbols are equivalence classes of characters that every transition treats alike
+    def test_alphabet_classes(self):
+        identifier = regex_to_dfa("[a-zA-Z_][a-zA-Z0-9_]*")
+        self.assertEqual(identifier.ranges, [((48, 57),), ((65, 90), (95, 95), (97, 122))])
+        self.assertEqual(identifier.compile().width, 4)  # 2 classes + "other" + pad
+        self.assertEqual(identifier.compile().byte_columns[ord("_")], identifier.compile().byte_columns[ord("Q")])
+        self.assertEqual(len(regex_to_dfa("(a|b)*abb").ranges), 2)
+        self.assertEqual(len(regex_to_dfa("[\\x00-\\xff]{4}").ranges), 1)
+
     # Problem 2: PDA for odd-length palindromes
     def test_pda_odd_palindrome(self):
         pda = PDA()
@@ -40,6 +258,76 @@ class TestComputationalTheory(unittest.TestCase):
         # self.assertFalse(pda.simulate("abca"), "Should reject 'abca' (not palindrome)")
         # self.assertFalse(pda.simulate("ab1ba"), "Should reject 'ab1ba' (invalid symbol)")
 
+    # Problem 2: the PDA runs its transition relation, so it can execute any (nondeterministic) PDA
+    def test_pda_generic(self):
+        pda = PDA()
+        for string in ["", "ab", "abba", "abca", "aab", "bab", "abbba"]:
+            self.assertEqual(pda.simulate(string), len(string) % 2 == 1 and string == string[::-1], string)
+        
+        # {a^n b^n}: guess the switch with an epsilon move
+        anbn = PDA({('s', 'a', None): ('s', ['A']), ('s', None, None): ('t', []),
+                    ('t', 'b', 'A'): ('t', []), ('t', None, 'Z'): ('f', [])}, start_state='s', accept_state='f')
+        self.assertEqual([anbn.simulate(string) for string in ["", "ab", "aabb", "aab", "ba"]], [True, True, True, False, False])
+        
+        # An epsilon loop that keeps pushing never runs out of configurations; the budget stops it
+        pushing = PDA({('s', None, None): [('s', ['X']), ('t', [])]}, start_state='s', accept_state='f')
+        self.assertIsNone(pushing.run("a", max_steps=1000))
+        # simulate, simulate_many and trace are budgeted by default; an exhausted budget is a rejection
+        self.assertFalse(pushing.simulate("a", max_steps=1000))
+        self.assertEqual(pushing.simulate_many(["a", ""], max_steps=1000), [False, False])
+        self.assertEqual(pushing.trace("a", max_steps=1000)['accepted'], None)
+        self.assertEqual(pushing.trace("a", max_steps=1000)['steps'], 1000)
+
+    # Problem 2: the odd-palindrome fast path and simulate_many give the stack simulation's verdicts
+    def test_pda_fast_path(self):
+        rng = random.Random(15)
+        strings = []
+        for _ in range(2000):
+            half = ''.join(rng.choice("ab") for _ in range(rng.randrange(8)))
+            shape = rng.random()
+            if shape < 0.4:
+                strings.append(half + rng.choice("ab") + half[::-1])  # Odd palindrome
+            elif shape < 0.5:
+                strings.append(half + rng.choice("abcé") + half[::-1])  # Palindrome, maybe with an invalid symbol
+            else:
+                strings.append(half + ''.join(rng.choice("ab") for _ in range(rng.randrange(3))))
+        slow = PDA(fast=False)
+        expected = [slow.simulate(string) for string in strings]
+        pda = PDA()
+        self.assertEqual([pda.simulate(string) for string in strings], expected)
+        self.assertEqual(list(pda.simulate_many(strings)), expected)
+        self.assertEqual(list(pda.simulate_many([b"aba", bytearray(b"abba"), memoryview(b"bab"), "é"])), [True, False, True, False])
+
+    # Problem 2: a grammar compiled to a PDA and the Earley recognizer agree on random inputs
+    def test_cfg_backends(self):
+        rng = random.Random(14)
+        grammars = [(CFG({'S': ["aSa", "bSb", "a", "b"]}), "ab"),
+                    (CFG({'S': ["(S)S", ""]}), "()"),
+                    (CFG({'E': ["TX"], 'X': ["+TX", ""], 'T': ["FY"], 'Y': ["*FY", ""], 'F': ["(E)", "a"]}, 'E'), "a+*()"),
+                    (CFG({'S': ["AB", "BA"], 'A': ["a", "aAa", "aAb", "bAa", "bAb"], 'B': ["b", "aBa", "aBb", "bBa", "bBb"]}), "ab")]
+        for grammar, alphabet in grammars:
+            pda = grammar.to_pda()
+            for _ in range(300):
+                string = ''.join(rng.choice(alphabet) for _ in range(rng.randrange(9)))
+                self.assertEqual(pda.run(string, max_steps=200000), grammar.recognize(string), string)
+        
+        # The palindrome grammar recognizes the same language as the hand-built PDA
+        palindromes = grammars[0][0]
+        for string in ["", "a", "ab", "aba", "abba", "bbabababb", "abcba"]:
+            self.assertEqual(palindromes.recognize(string), PDA().simulate(string), string)
+        
+        # Earley also handles left recursion, which would send the compiled PDA into unbounded epsilon pushing,
+        # so to_pda rejects it (direct, indirect or hidden behind a nullable nonterminal)
+        expressions = CFG({'E': ["E+T", "T"], 'T': ["T*F", "F"], 'F': ["(E)", "a"]}, 'E')
+        self.assertTrue(expressions.recognize("a+a*(a+a)"))
+        self.assertFalse(expressions.recognize("a+"))
+        self.assertEqual(expressions.left_recursive(), ['E', 'T'])
+        for grammar in [expressions, CFG({'E': ["E+T", "T"], 'T': ["a"]}, 'E'), CFG({'S': ["Ab", "a"], 'A': ["Sa"]}),
+                        CFG({'S': ["NSa", "b"], 'N': ["", "c"]})]:
+            with self.assertRaises(ValueError):
+                grammar.to_pda()
+        self.assertEqual([grammar.left_recursive() for grammar, _ in grammars], [[], [], [], []])
+
     # Problem 3: TM for {0^n 1^n 0^n 1^n | n >= 0}
     def test_tm_0101(self):
         tm = TuringMachine()
@@ -56,5 +344,325 @@ class TestComputationalTheory(unittest.TestCase):
         # self.assertFalse(tm.simulate("10"), "Should reject '10' (wrong order)")
         # self.assertFalse(tm.simulate("0011a011"), "Should reject '0011a011' (invalid symbol)")
 
+    # Problem 3: the compiled machine gives the interpreter's verdicts and step counts
+    def test_tm_compiled(self):
+        tm = TuringMachine()
+        compiled = tm.compile()
+        rng = random.Random(16)
+        for _ in range(1000):
+            string = ''.join(rng.choice("01") for _ in range(rng.randrange(14)))
+            self.assertEqual(compiled.run(string), tm.interpret(string), string)
+        for n in range(6):
+            string = "0" * n + "1" * n + "0" * n + "1" * n
+            self.assertEqual(compiled.run(string), tm.interpret(string))
+            self.assertEqual(compiled.run(string + "1"), tm.interpret(string + "1"))
+        self.assertEqual(compiled.run("01a1"), TMResult(REJECT, 'invalid symbol', 0))
+        
+        # The tape grows to the left when the head walks off the start
+        leftward = TuringMachine()
+        leftward.transitions = {('q0', '0'): ('q0', '0', 'L'), ('q0', '_'): ('q1', '1', 'L'),
+                                ('q1', '_'): ('q2', '1', 'L'), ('q2', '_'): ('q_accept', '_', 'R')}
+        self.assertEqual(leftward.compile().run("000"), leftward.interpret("000"))
+
+    # Problem 3: macro-steps over self-loop sweeps keep the interpreter's verdicts and step counts
+    def test_tm_macro_steps(self):
+        tm = TuringMachine()
+        compiled = tm.compile()
+        rng = random.Random(17)
+        for _ in range(1000):
+            string = ''.join(rng.choice("01") for _ in range(rng.randrange(14)))
+            self.assertEqual(compiled.run(string, macro=True), tm.interpret(string), string)
+        for n in (1, 7, 40):
+            string = "0" * n + "1" * n + "0" * n + "1" * n
+            self.assertEqual(compiled.run(string, macro=True), tm.interpret(string))
+            self.assertEqual(compiled.run(string[:-1], macro=True), tm.interpret(string[:-1]))
+        
+        # Sweeps in both directions, off the left end of the tape (so it grows) and across cells it wrote
+        bouncing = TuringMachine()
+        bouncing.transitions = {('q0', '0'): ('q0', '0', 'R'), ('q0', '1'): ('q0', '1', 'R'), ('q0', '_'): ('q1', 'X', 'L'),
+                                ('q1', '0'): ('q1', '0', 'L'), ('q1', '1'): ('q1', '1', 'L'), ('q1', '_'): ('q2', 'Y', 'L'),
+                                ('q2', '_'): ('q3', 'Y', 'L'), ('q3', '_'): ('q4', 'Y', 'R'),
+                                ('q4', '0'): ('q4', '0', 'R'), ('q4', '1'): ('q4', '1', 'R'), ('q4', 'Y'): ('q4', 'Y', 'R'),
+                                ('q4', 'X'): ('q_accept', 'X', 'R')}
+        for string in ["", "0", "0110", "1" * 30]:
+            self.assertEqual(bouncing.compile().run(string, macro=True), bouncing.interpret(string), string)
+
+    # Problem 3: step budgets, timeouts and cycle detection give UNKNOWN instead of hanging
+    def test_tm_budgets(self):
+        tm = TuringMachine()
+        string = "0" * 30 + "1" * 30 + "0" * 30 + "1" * 30
+        self.assertEqual(tm.run(string, max_steps=1000), TMResult(UNKNOWN, 'step budget', 1000))
+        self.assertEqual(tm.run(string, max_steps=1000, macro=False), tm.interpret(string, max_steps=1000))
+        self.assertEqual(tm.run(string, max_steps=10 ** 6).verdict, ACCEPT)
+        self.assertFalse(tm.simulate(string, max_steps=1000))
+        self.assertEqual(tm.run("0" * 2000 + "1" * 2000 + "0" * 2000 + "1" * 2000, timeout=0.001, macro=False).reason, 'timeout')
+        
+        # Random machines: same verdicts and step counts as the interpreter under the same budget
+        rng = random.Random(18)
+        for _ in range(200):
+            machine = TuringMachine()
+            machine.transitions = {}
+            for state in ('q0', 'q1', 'q2'):
+                for symbol in '01_':
+                    if rng.random() < 0.9:
+                        machine.transitions[(state, symbol)] = (rng.choice(['q0', 'q1', 'q2', 'q0', 'q1', 'q2', 'q_accept', 'q_reject']),
+                                                                rng.choice('01_'), rng.choice('LR'))
+            string = ''.join(rng.choice("01") for _ in range(rng.randrange(6)))
+            expected = machine.interpret(string, max_steps=300)
+            for macro in (False, True):
+                self.assertEqual(machine.compile().run(string, macro=macro, max_steps=300, detect_cycles=False), expected)
+                result = machine.compile().run(string, macro=macro, max_steps=300)
+                self.assertIn(result.verdict, (expected.verdict, UNKNOWN))
+                if result.verdict != UNKNOWN:
+                    self.assertEqual(result, expected)
+        
+        # Machines that never halt: bouncing in place, or walking over blanks from an empty tape, repeat a
+        # configuration, and walking off the end of the input is an unbounded sweep
+        bouncing = TuringMachine()
+        bouncing.transitions = {('q0', '_'): ('q1', 'X', 'R'), ('q1', '_'): ('q2', '_', 'L'),
+                                ('q2', 'X'): ('q3', '_', 'L'), ('q3', '_'): ('q0', '_', 'R')}
+        walking = TuringMachine()
+        walking.transitions = {('q0', '_'): ('q0', '_', 'R'), ('q0', '0'): ('q0', '0', 'R')}
+        self.assertEqual(bouncing.run("").reason, 'cycle')
+        self.assertEqual(walking.run("", macro=False).reason, 'cycle')
+        self.assertEqual(walking.run("00").reason, 'unbounded sweep')
+        self.assertEqual(walking.run("00", max_steps=5000, macro=False), TMResult(UNKNOWN, 'step budget', 5000))
+
+    # Problem 3: machines loaded from a transition table, with wildcard rules, match the built-in one
+    def test_tm_loader(self):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Problem 3", "machines", "0n1n0n1n.tm")
+        loaded = load_machine(path)
+        builtin = TuringMachine()
+        self.assertEqual(loaded.transitions, builtin.transitions)
+        self.assertIs(load_machine(path), loaded)  # Cached, already compiled
+        self.assertIsNotNone(loaded.compiled)
+        for string in ["", "0101", "00110011", "0011001", "1010", "0102"]:
+            self.assertEqual(loaded.run(string), builtin.run(string), string)
+        
+        # The JSON form of the same kind of rules
+        definition = {'input': "ab", 'start': 's', 'accept': 'yes', 'reject': 'no',
+                      'transitions': [['s', 'a', 's', '*', 'R'], ['s', '_', 'yes', '_', 'S'], ['s', '*', 'no', '*', 'R']]}
+        only_a = machine_from_text(json.dumps(definition))
+        self.assertEqual([only_a.simulate(string) for string in ["", "aaa", "aba"]], [True, True, False])
+        
+        # Malformed machines are rejected when they are loaded
+        for text in ["input: 0\nstart: q0\naccept: a\nreject: r\nq0 0 q0 0 U",  # Bad move
+                     "input: 0\nstart: q0\naccept: a\nreject: r\nq0 7 q0 0 R",  # Unknown symbol
+                     "input: 0\nstart: q0\naccept: a\nreject: r\nq0 0 q0 0 R\nq0 0 a 0 R",  # Duplicate rule
+                     "input: 0\nstart: q0\naccept: a\nreject: r\na 0 q0 0 R",  # Rule out of a halting state
+                     "input: 0\nstart: q0\naccept: a\nq0 0 q0 0 R",  # No reject state
+                     "input: 0\nstart: q0\naccept: a\nreject: r\nq0 0 q0"]:  # Short rule
+            with self.assertRaises(ValueError, msg=text):
+                machine_from_text(text)
+
+    # Batch runner: verdicts in input order, the same with one process or a pool of small chunks
+    def test_batch_runner(self):
+        rng = random.Random(20)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "inputs.txt")
+            strings = [''.join(rng.choice("ab") for _ in range(rng.randrange(8))) for _ in range(200)]
+            with open(path, "w") as file:
+                file.write('\n'.join(strings) + '\n')
+            dfa = regex_to_dfa("(a|b)*abb")
+            for kind, expected in (("dfa", [dfa.simulate(string) for string in strings]), ("pda", [PDA().simulate(string) for string in strings])):
+                outputs = []
+                for workers in ("1", "2"):
+                    output = io.StringIO()
+                    run_machines.main([kind, path, "--regex", "(a|b)*abb", "-w", workers, "-c", "7"], output=output)
+                    outputs.append(output.getvalue())
+                self.assertEqual(outputs[0], outputs[1])
+                self.assertEqual(outputs[0].splitlines(), ["ACCEPT" if accepted else "REJECT" for accepted in expected])
+            
+            with open(path, "w") as file:
+                file.write("0101\n00110011\n\n")
+            output = io.StringIO()
+            run_machines.main(["tm", path, "--max-steps", "30", "-w", "2", "-c", "1"], output=output)
+            self.assertEqual(output.getvalue().splitlines(), ["ACCEPT\taccept state\t18", "UNKNOWN\tstep budget\t30", "ACCEPT\taccept state\t1"])
+
+    # Tracing: the instrumented paths agree with the plain ones and expose counters and sampled configurations
+    def test_tracing(self):
+        dfa = regex_to_dfa("(a|b)*abb")
+        for string in ["aabb", "abab", "aacbb", ""]:
+            traced = dfa.trace(string)
+            self.assertEqual(traced['accepted'], dfa.simulate(string))
+            self.assertEqual(sum(traced['state_visits'].values()), traced['steps'] + 1)
+        self.assertEqual([sample[0] for sample in dfa.trace("ab" * 10, sample_every=5)['trace']], [0, 5, 10, 15])
+        
+        pda = PDA()
+        for string in ["abbba", "abba", "a"]:
+            traced = pda.trace(string)
+            self.assertEqual(traced['accepted'], pda.run(string))
+            self.assertEqual(sum(traced['state_visits'].values()), traced['steps'])
+        self.assertEqual(pda.trace("aaaaa")['max_stack_depth'], 6)  # Z plus every symbol pushed by the longest guess
+        self.assertIsNone(pda.trace("ababa", max_steps=3)['accepted'])
+        
+        tm = TuringMachine()
+        for string in ["0101", "00110011", "0011", "01a1"]:
+            traced = tm.trace(string, sample_every=7, window=2)
+            self.assertEqual(traced['result'], tm.interpret(string))
+            self.assertEqual(sum(traced['state_visits'].values()), traced['result'].steps)
+        traced = tm.trace("0101", window=2)
+        self.assertEqual(traced['trace'][0], (0, 'q0', 0, "__010"))
+        self.assertEqual(traced['tape_extent'], (-1, 4))
+
+    # Service: a burst of concurrent requests from the load generator gets correct, batched, bounded-latency answers
+    def test_service_load(self):
+        requests = service_requests(2000, seed=23)
+        requests.append({'id': 'long', 'machine': 'tm', 'input': "0" * 60 + "1" * 60 + "0" * 60 + "1" * 60})
+        requests.append({'id': 'budget', 'machine': 'tm', 'input': "0" * 60 + "1" * 60 + "0" * 60 + "1" * 60, 'max_steps': 50})
+        requests.append({'id': 'bad', 'machine': 'dfa', 'regex': "(a|b", 'input': "ab"})
+        requests.append({'id': 'unknown', 'machine': 'nfa', 'input': "ab"})
+        service = MachineService(inline_steps=1000, max_pending=64)
+
+        async def serve_and_load():
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "machines.sock")
+                server = await asyncio.start_unix_server(service.serve_connection, path, backlog=4096)
+                async with server:
+                    return await generate_load(path, requests, connections=20)
+
+        try:
+            responses, latencies = asyncio.run(serve_and_load())
+        finally:
+            service.close()
+        dfa, pda, tm = regex_to_dfa("(a|b)*abb"), PDA(), TuringMachine()
+        for request in requests[:2000]:
+            response = responses[request['id']]
+            if request['machine'] == 'tm':
+                result = tm.run(request['input'])
+                self.assertEqual((response['verdict'], response['steps']), (result.verdict, result.steps))
+            else:
+                machine = dfa if request['machine'] == 'dfa' else pda
+                self.assertEqual(response['verdict'], "ACCEPT" if machine.simulate(request['input']) else "REJECT")
+        self.assertEqual(responses['long']['verdict'], ACCEPT)  # Ran in the process pool
+        self.assertEqual(service.offloaded, 1)
+        self.assertEqual((responses['budget']['verdict'], responses['budget']['steps']), (UNKNOWN, 50))
+        self.assertIn('error', responses['bad'])
+        self.assertIn('error', responses['unknown'])
+        self.assertLess(sorted(latencies.values())[int(len(latencies) * 0.99)], 2.0)
+
+    # Service: a request that fails anywhere (parsing, compiling its machine, or inside a batch) only gets an error
+    # response; the requests around it, including the rest of its batch, are still answered
+    def test_service_errors(self):
+        class Exploding:
+            def simulate(self, input_string):
+                if input_string == "boom":
+                    raise RuntimeError("boom")
+                return input_string == "ok"
+
+            def simulate_many(self, strings):
+                return [self.simulate(string) for string in strings]
+
+        requests = [{'id': index, 'machine': 'dfa', 'regex': "(a|b)*abb", 'input': "ab" * (index % 3) + "b"} for index in range(40)]
+        requests += [{'id': 'surrogate', 'machine': 'dfa', 'regex': "(a|b)*abb", 'input': "\ud800"},
+                     {'id': 'nested', 'machine': 'dfa', 'regex': "(" * 5000 + "a" + ")" * 5000, 'input': "a"},
+                     {'id': 'nested again', 'machine': 'dfa', 'regex': "(" * 5000 + "a" + ")" * 5000, 'input': "a"},
+                     {'id': 'huge', 'machine': 'dfa', 'regex': "[ab]*a[ab]{20}", 'input': "ba" + "b" * 20},
+                     {'id': 'huge reject', 'machine': 'dfa', 'regex': "[ab]*a[ab]{20}", 'input': "b" * 22},
+                     {'id': 'table', 'machine': 'tm', 'table': 5, 'input': "01"},
+                     {'id': 'steps', 'machine': 'pda', 'input': "aba", 'max_steps': float('inf')},
+                     {'id': 'boom', 'machine': 'dfa', 'regex': "exploding", 'input': "boom"},
+                     {'id': 'ok', 'machine': 'dfa', 'regex': "exploding", 'input': "ok"},
+                     {'id': 'tm', 'machine': 'tm', 'input': "0101"}]
+        service = MachineService(batch_size=8)
+        service.machines[('dfa', "exploding")] = Exploding()
+        lines = [json.dumps(request).replace("Infinity", "1e400") for request in requests]
+        responses = []
+
+        async def serve():
+            reader = asyncio.StreamReader()
+            reader.feed_data(''.join(line + '\n' for line in lines).encode())
+            reader.feed_eof()
+
+            async def write(line):
+                responses.append(json.loads(line))
+
+            await service.handle(reader, write)
+
+        asyncio.run(serve())
+        service.close()
+        responses = {response['id']: response for response in responses}
+        self.assertEqual(len(responses), len(requests))
+        dfa = regex_to_dfa("(a|b)*abb")
+        for request in requests[:40]:
+            self.assertEqual(responses[request['id']]['verdict'], "ACCEPT" if dfa.simulate(request['input']) else "REJECT")
+        self.assertEqual(responses['surrogate']['verdict'], "REJECT")
+        for name in ('nested', 'nested again', 'table', 'steps', 'boom'):
+            self.assertIn('error', responses[name], name)
+        self.assertEqual(responses['nested again']['error'], responses['nested']['error'])
+        self.assertIsInstance(service.machines[('dfa', "(" * 5000 + "a" + ")" * 5000)], str)  # Not compiled again
+        # 2^21 DFA states: over dfa_states, so the regex runs lazily instead of stalling the loop in subset construction
+        self.assertIsInstance(service.machines[('dfa', "[ab]*a[ab]{20}")], LazyDFA)
+        self.assertEqual((responses['huge']['verdict'], responses['huge reject']['verdict']), (ACCEPT, "REJECT"))
+        with self.assertRaises(ValueError):
+            nfa_to_dfa(build_nfa("[ab]*a[ab]{20}"), max_states=1000)
+        self.assertEqual(responses['boom']['error'], "boom")
+        self.assertEqual(responses['ok']['verdict'], ACCEPT)
+        self.assertEqual(responses['tm']['verdict'], ACCEPT)
+
+    # Compact machines: a DFA's table alone simulates the same language, machines share alphabets and table entries,
+    # and the automata carry no per-instance __dict__
+    def test_compact_machines(self):
+        rng = random.Random(24)
+        strings = [''.join(rng.choice("abc\u00e9\u4e00") for _ in range(rng.randrange(12))) for _ in range(500)]
+        for regex in ("(a|b)*abb", "[a-c]+\u00e9?", "(\u4e00|ab)*"):
+            dfa = regex_to_dfa(regex)
+            table = regex_to_dfa(regex).compact()
+            self.assertEqual([table.simulate(string) for string in strings], [dfa.simulate(string) for string in strings])
+            self.assertEqual([bool(accepted) for accepted in table.simulate_many(strings)], [dfa.simulate(string) for string in strings])
+        self.assertIs(regex_to_dfa("(a|b)*abb").compact().lookup, regex_to_dfa("(b|a)*bba").compact().lookup)
+        text = random_machine_text(random.Random(24))
+        first, second = TuringMachine(json.loads(json.dumps(parse_machine(text)))), TuringMachine(parse_machine(text))
+        self.assertTrue(all(a is b for a, b in zip(first.compile().table, second.compile().table)))
+        self.assertTrue(all(key in second.transitions and value is second.transitions[key] for key, value in first.transitions.items()))
+        for machine in (regex_to_dfa("ab"), regex_to_dfa("ab").compact(), PDA(), TuringMachine(), TuringMachine().compile(), TMResult(ACCEPT, 'accept state', 1)):
+            self.assertFalse(hasattr(machine, '__dict__'))
+        memory = machine_memory(100)
+        self.assertLess(memory['dfa_compact'][0], memory['dfa'][0])
+
+    # Language operations: products agree with both DFAs on every short string, and the lazy checks find shortest
+    # witnesses, inclusion and equivalence across patterns with different alphabets
+    def test_language_operations(self):
+        patterns = ["(a|b)*abb", "a*b*", "[ab]*c?", "(ab|ba)*", "[a-c]", "a|b|c", "b+"]
+        strings = [''.join(letters) for length in range(6) for letters in itertools.product("abcz", repeat=length)] + ["\u00e9"]
+        dfas = [regex_to_dfa(pattern) for pattern in patterns]
+        for first in dfas:
+            complement = first.complement()
+            self.assertTrue(all(complement.simulate(string) != first.simulate(string) for string in strings))
+            for second in dfas:
+                intersection, union, difference = first.intersection(second), first.union(second), first.difference(second)
+                for string in strings:
+                    a, b = first.simulate(string), second.simulate(string)
+                    self.assertEqual((intersection.simulate(string), union.simulate(string), difference.simulate(string)),
+                                     (a and b, a or b, a and not b))
+                self.assertEqual(first.equivalent(second), all(first.simulate(string) == second.simulate(string) for string in strings))
+                self.assertEqual(first.subset_of(second), all(second.simulate(string) for string in strings if first.simulate(string)))
+        self.assertEqual(regex_to_dfa("(a|b)*abb").shortest_witness(), "abb")
+        self.assertEqual(regex_to_dfa("(a|b)*abb").complement().shortest_witness(), "")
+        self.assertEqual(regex_to_dfa("x*(a|b)*abb").overlap(regex_to_dfa("x+[a-c]+")), "xabb")
+        self.assertIsNone(regex_to_dfa("a+").overlap(regex_to_dfa("b+")))
+        self.assertTrue(regex_to_dfa("a+").intersection(regex_to_dfa("b+")).is_empty())
+        self.assertTrue(regex_to_dfa("[a-c]").equivalent(regex_to_dfa("a|b|c")))
+        big = regex_to_dfa("(a|b)*a" + "(a|b)" * 10)
+        self.assertTrue(big.equivalent(big.minimize()))
+        self.assertFalse(big.equivalent(regex_to_dfa("(a|b)*a" + "(a|b)" * 9)))
+        self.assertEqual(big.overlap(regex_to_dfa("a+")), "a" * 11)
+        self.assertTrue(regex_to_dfa("b*a" + "(a|b)" * 10).subset_of(big))
+
+    # Benchmark suite: a metric counts as a regression only when it is worse than the baseline beyond the tolerance
+    def test_bench_compare(self):
+        baseline = {'rate': {'value': 100.0, 'unit': 'bytes/s', 'better': 'higher'},
+                    'time': {'value': 1.0, 'unit': 's', 'better': 'lower'},
+                    'gone': {'value': 1.0, 'unit': 's', 'better': 'lower'}}
+        results = {'rate': {'value': 60.0, 'unit': 'bytes/s', 'better': 'higher'},
+                   'time': {'value': 1.1, 'unit': 's', 'better': 'lower'},
+                   'new': {'value': 5.0, 'unit': 's', 'better': 'lower'}}
+        lines, regressions, missing = compare(results, baseline, tolerance=0.2)
+        self.assertEqual(regressions, ['rate'])
+        self.assertEqual(missing, ['new'])  # Reported, not silently skipped
+        self.assertEqual(len(lines), 3)
+        self.assertIn("NOT IN BASELINE", lines[2])
+        self.assertEqual(compare(results, baseline, tolerance=0.5)[1], [])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file